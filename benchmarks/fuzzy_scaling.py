@@ -0,0 +1,88 @@
+'''
+Scaling benchmark for eda_tools.fuzzy_duplicates.
+
+Generates synthetic names/addresses with planted near-duplicates (typos, case, suffix spelling)
+and times fuzzy_duplicates at growing row counts, reporting seconds per million rows at each size.
+
+    python benchmarks/fuzzy_scaling.py --sizes 10000 100000 1000000 10000000
+'''
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from eda_tools.fuzzy_duplicates import fuzzy_duplicates
+
+FIRST = ['JOHN', 'MARY', 'ROBERT', 'PATRICIA', 'MICHAEL', 'LINDA', 'WILLIAM', 'ELIZABETH', 'DAVID', 'BARBARA']
+LAST = ['SMITH', 'JOHNSON', 'WILLIAMS', 'BROWN', 'JONES', 'GARCIA', 'MILLER', 'DAVIS', 'RODRIGUEZ', 'MARTINEZ']
+STREETS = ['MAIN', 'OAK', 'PINE', 'MAPLE', 'CEDAR', 'ELM', 'WASHINGTON', 'LAKE', 'HILL', 'PARK']
+SUFFIXES = [('STREET', 'ST'), ('AVENUE', 'AVE'), ('ROAD', 'RD'), ('DRIVE', 'DR')]
+STATES = ['CA', 'TX', 'FL', 'NY', 'PA', 'IL', 'OH', 'GA', 'NC', 'MI']
+
+
+def _typo(words, rng, rate):
+    words = np.array(words, dtype=object)
+    hit = np.flatnonzero(rng.random(len(words)) < rate)
+    for i in hit:
+        w = words[i]
+        j = rng.integers(1, len(w))
+        words[i] = w[:j] + w[j + 1:]
+    return words
+
+
+def synthetic_people(n, seed=0, duplicate_rate=0.2):
+    '''
+    n person records; about duplicate_rate of them are perturbed copies of earlier records
+    '''
+    rng = np.random.default_rng(seed)
+    first = rng.choice(FIRST, n).astype(object)
+    # a vocabulary of surnames that grows with n keeps blocks at a realistic size
+    consonants = rng.choice(list('BCDFGHKLMNPRSTVWZ'), (max(n // 5, len(LAST)), 4))
+    vowels = rng.choice(list('AEIOU'), consonants.shape)
+    vocabulary = np.array([''.join(c + v for c, v in zip(cs, vs)) for cs, vs in zip(consonants, vowels)], dtype=object)
+    last = rng.choice(vocabulary, n)
+    house = rng.integers(1, max(n // 10, 10000), n).astype(str).astype(object)
+    street = rng.choice(STREETS, n).astype(object)
+    suffix = rng.integers(0, len(SUFFIXES), n)
+    long_form = rng.random(n) < 0.5
+    suffix_text = np.array([SUFFIXES[s][0] if lf else SUFFIXES[s][1] for s, lf in zip(suffix, long_form)], dtype=object)
+    state = rng.choice(STATES, n).astype(object)
+
+    dup = np.flatnonzero(rng.random(n) < duplicate_rate)
+    source = rng.integers(0, n, len(dup))
+    for arr in (first, last, house, street, state):
+        arr[dup] = arr[source]
+    suffix_text[dup] = np.array([SUFFIXES[s][int(lf)] for s, lf in zip(suffix[source], long_form[source])], dtype=object)
+    first[dup] = _typo(first[dup], rng, 0.3)
+    lower = rng.random(len(dup)) < 0.3
+    first[dup[lower]] = [f.title() for f in first[dup[lower]]]
+
+    return pd.DataFrame({
+        'first': first,
+        'last': last,
+        'address': house + ' ' + street + ' ' + suffix_text,
+        'state': state,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--window', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'seconds':>9} {'s / 1M rows':>12} {'name dupes':>11} {'addr dupes':>11}")
+    for n in args.sizes:
+        df = synthetic_people(n)
+        start = time.perf_counter()
+        result = fuzzy_duplicates(df['first'], df['last'], df['address'], geo=df['state'], window=args.window)
+        elapsed = time.perf_counter() - start
+        print(f"{n:>10} {elapsed:>9.2f} {elapsed / n * 1e6:>12.2f} {result['Fuzzy Duplicated Name'].sum():>11} {result['Fuzzy Duplicated Address'].sum():>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+'''
+Benchmark suite for the main eda_tools entry points on seeded synthetic data.
+
+Each benchmark is timed (best of --repeat runs) and then run once more under tracemalloc for
+its peak Python/numpy memory. Results are written as JSON; with --baseline they are compared to
+a stored run and any benchmark slower or larger than the baseline by more than --tolerance is
+flagged (exit status 1).
+
+    python benchmarks/run_benchmarks.py --sizes 10000 100000 1000000 10000000 --out results.json
+    python benchmarks/run_benchmarks.py --sizes 10000 100000 --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --sizes 10000 100000 --baseline benchmarks/baseline.json
+
+Profile reports are only generated up to --profile-max-rows rows, and are skipped if
+ydata-profiling isn't installed.
+'''
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.synthetic_data import pii_frame, wide_frame
+from eda_tools.PII_EDA_tool import PII_EDA
+from eda_tools.missing_analysis import top_missing_variables
+
+try:
+    from eda_tools.EDA_tool import Correlation
+    from eda_tools.profile_tiers import ProfilePlan
+except ImportError:
+    Correlation = ProfilePlan = None
+
+
+def _profile(df):
+    return ProfilePlan(df).build()
+
+
+# name -> (data kind, function of the frame); each call starts from a fresh object so memoized results don't count
+BENCHMARKS = {
+    'PII_EDA.identify_duplicates': ('pii', lambda df: PII_EDA.from_frame(df).identify_duplicates()),
+    'PII_EDA.get_hit_rates': ('pii', lambda df: PII_EDA.from_frame(df).get_hit_rates()),
+    'Correlation.correlation_table': ('wide', lambda df: Correlation(df, 'Pearson').correlation_table()),
+    'missing_analysis.top_missing_variables': ('wide', top_missing_variables),
+    'ProfileReport': ('wide', _profile),
+}
+
+
+def measure(fn, df, repeat):
+    '''
+    Best wall time over `repeat` runs and the tracemalloc peak (MB) of one more run
+    '''
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn(df)
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(df)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(times), peak / 2 ** 20
+
+
+def run(sizes, names, repeat=3, seed=0, profile_max_rows=100000):
+    results = []
+    for n in sizes:
+        frames = {}
+        for name in names:
+            kind, fn = BENCHMARKS[name]
+            record = {'benchmark': name, 'rows': n}
+
+            if name == 'ProfileReport' and (ProfilePlan is None or n > profile_max_rows):
+                record['skipped'] = 'ydata-profiling not installed' if ProfilePlan is None else f'more than {profile_max_rows} rows'
+            elif name.startswith('Correlation') and Correlation is None:
+                record['skipped'] = 'ydata-profiling not installed'
+            else:
+                if kind not in frames:
+                    frames[kind] = pii_frame(n, seed) if kind == 'pii' else wide_frame(n, seed)
+                record['seconds'], record['peak_mb'] = measure(fn, frames[kind], repeat)
+
+            results.append(record)
+            print(f"{name:<42} {n:>10} " + (f"{record['seconds']:>9.3f}s {record['peak_mb']:>9.1f} MB" if 'seconds' in record else f"skipped: {record['skipped']}"))
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    '''
+    Benchmarks slower or using more memory than the baseline by more than `tolerance` (a fraction)
+    '''
+    previous = {(r['benchmark'], r['rows']): r for r in baseline['results'] if 'seconds' in r}
+    regressions = []
+    for r in results:
+        base = previous.get((r['benchmark'], r['rows']))
+        if base is None or 'seconds' not in r:
+            continue
+        for metric in ['seconds', 'peak_mb']:
+            if r[metric] > base[metric] * (1 + tolerance):
+                regressions.append({'benchmark': r['benchmark'], 'rows': r['rows'], 'metric': metric,
+                                    'baseline': base[metric], 'current': r[metric], 'ratio': r[metric] / base[metric]})
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--profile-max-rows', type=int, default=100000)
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='compare against this results file')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--save-baseline', help='also write the results to this file as the new baseline')
+    args = parser.parse_args()
+    paths = {k: os.path.abspath(getattr(args, k)) if getattr(args, k) else None for k in ['out', 'baseline', 'save_baseline']}
+    # profile configs are looked up relative to the repo root
+    os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+    output = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': run(args.sizes, args.benchmarks, args.repeat, args.seed, args.profile_max_rows),
+    }
+
+    regressions = []
+    if paths['baseline']:
+        with open(paths['baseline']) as f:
+            regressions = compare(output['results'], json.load(f), args.tolerance)
+        output['regressions'] = regressions
+        for r in regressions:
+            print(f"REGRESSION {r['benchmark']} at {r['rows']} rows: {r['metric']} {r['baseline']:.3f} -> {r['current']:.3f} ({r['ratio']:.2f}x)")
+
+    for path in filter(None, [paths['out'], paths['save_baseline']]):
+        with open(path, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
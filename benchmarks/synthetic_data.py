@@ -0,0 +1,129 @@
+'''
+Seeded synthetic data for the benchmarks.
+
+wide_frame scales test.csv to any number of rows: rows are bootstrapped from it (keeping its
+column correlations and missing patterns) and jittered so values don't simply repeat.
+pii_frame builds a PII_EDA-shaped frame with the p_inp* columns, -99999 / -99998 sentinels,
+flag columns and planted duplicate addresses, phones, SSNs and names.
+
+    python benchmarks/synthetic_data.py --kind pii --rows 1000000 --out pii_1m.csv
+'''
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'test.csv')
+
+FIRST = ['JOHN', 'MARY', 'ROBERT', 'PATRICIA', 'MICHAEL', 'LINDA', 'WILLIAM', 'ELIZABETH', 'DAVID', 'BARBARA',
+         'JAMES', 'JENNIFER', 'RICHARD', 'MARIA', 'JOSEPH', 'SUSAN', 'THOMAS', 'MARGARET', 'CHARLES', 'DOROTHY']
+STREETS = ['MAIN', 'OAK', 'PINE', 'MAPLE', 'CEDAR', 'ELM', 'WASHINGTON', 'LAKE', 'HILL', 'PARK']
+SUFFIXES = ['ST', 'AVE', 'RD', 'DR', 'LN', 'CT']
+STATES = ['CA', 'TX', 'FL', 'NY', 'PA', 'IL', 'OH', 'GA', 'NC', 'MI', 'NJ', 'VA', 'WA', 'AZ', 'MA']
+CITIES = ['SPRINGFIELD', 'FRANKLIN', 'GREENVILLE', 'BRISTOL', 'CLINTON', 'FAIRVIEW', 'SALEM', 'MADISON']
+
+FLAG_COLUMNS = ['p_inpclnnamefirstflag', 'p_inpclnnamelastflag', 'p_inpclnaddrfullflag',
+                'p_inpclnphonehomeflag', 'p_inpclnssnflag', 'p_inpclndobflag']
+SENTINEL = -99999
+NOT_FOUND = -99998
+
+
+def wide_frame(n, seed=0, template=TEMPLATE, jitter=0.05):
+    '''
+    n rows shaped like test.csv (same columns, dtypes, correlations and missing patterns)
+    '''
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(template, index_col=0)
+
+    df = base.iloc[rng.integers(0, len(base), n)]
+    values = df.to_numpy()
+    # multiplicative noise keeps the sign, the scale and the skew of each column
+    noise = 1 + jitter * rng.standard_normal(values.shape)
+    values = np.round(values * noise, 2)
+
+    return pd.DataFrame(values, index=df.index, columns=base.columns)
+
+
+def _with_sentinels(values, rng, rate, sentinel=SENTINEL):
+    values = values.astype(object)
+    values[rng.random(len(values)) < rate] = sentinel
+    return values
+
+
+def pii_frame(n, seed=0, duplicate_rate=0.1, sentinel_rate=0.03):
+    '''
+    n PII records in the layout PII_EDA reads; about duplicate_rate of the records reuse the
+    address, phone, SSN and/or name of an earlier record
+    '''
+    rng = np.random.default_rng(seed)
+    surnames = np.array([''.join(rng.choice(list('BCDFGHKLMNPRSTVWZ'), 3)) + s for s in ['SON', 'MAN', 'TON', 'LEY', 'ER']
+                         for _ in range(max(n // 500, 20))], dtype=object)
+
+    first = rng.choice(FIRST, n).astype(object)
+    last = rng.choice(surnames, n)
+    house = rng.integers(1, max(n, 10000), n)
+    street = rng.choice(STREETS, n).astype(object) + ' ' + rng.choice(SUFFIXES, n).astype(object)
+    city = rng.choice(CITIES, n).astype(object)
+    state = rng.choice(STATES, n).astype(object)
+    zipcode = rng.integers(10000, 99999, n)
+    phone = rng.integers(2000000000, 9999999999, n)
+    ssn = rng.integers(100000000, 899999999, n)
+    age = rng.integers(1, 105, n)
+
+    # planted duplicates: each picks which identifiers it copies from an earlier record
+    dup = np.flatnonzero(rng.random(n) < duplicate_rate)
+    source = (rng.random(len(dup)) * dup).astype('int64')
+    for arrays, share in [((house, street, city, state, zipcode), 0.6), ((phone,), 0.4), ((ssn,), 0.3), ((first, last), 0.5)]:
+        copy = rng.random(len(dup)) < share
+        for a in arrays:
+            a[dup[copy]] = a[source[copy]]
+
+    address = pd.Series(house).astype(str).to_numpy(dtype=object) + ' ' + street
+    dob = (2023 - age) * 10000 + rng.integers(1, 13, n) * 100 + rng.integers(1, 29, n)
+
+    df = pd.DataFrame({
+        'p_inpacct': np.arange(n),
+        # text columns read from CSV carry the sentinel as text
+        'p_inpnamefirst': _with_sentinels(first, rng, sentinel_rate, str(SENTINEL)),
+        'p_inpnamelast': _with_sentinels(last, rng, sentinel_rate, str(SENTINEL)),
+        'p_inpdob': _with_sentinels(dob, rng, sentinel_rate),
+        'pi_inpdobage': np.where(rng.random(n) < sentinel_rate, SENTINEL, age),
+        'p_inpaddrline1': _with_sentinels(address, rng, sentinel_rate),
+        'p_inpaddrline2': _with_sentinels(np.full(n, 'APT 1', dtype=object), rng, 0.8),
+        'p_inpaddrcity': _with_sentinels(city, rng, sentinel_rate),
+        'p_inpaddrstate': _with_sentinels(state, rng, sentinel_rate),
+        'p_inpaddrzip': _with_sentinels(zipcode, rng, sentinel_rate),
+        'p_inpphonehome': _with_sentinels(phone, rng, sentinel_rate),
+        'p_inpssn': _with_sentinels(ssn, rng, sentinel_rate),
+        'p_inpclnnamefirst': first,
+        'p_inpclnnamelast': last,
+        'p_inpclnaddrfull': _with_sentinels(address + ' ' + city + ' ' + state, rng, sentinel_rate),
+        'p_inpclnaddrstate': _with_sentinels(state, rng, sentinel_rate),
+        'p_inpclnphonehome': np.where(rng.random(n) < sentinel_rate, rng.choice([SENTINEL, NOT_FOUND], n), phone),
+        'p_inpclnssn': np.where(rng.random(n) < sentinel_rate, rng.choice([SENTINEL, NOT_FOUND], n), ssn),
+    })
+    for column in FLAG_COLUMNS:
+        df[column] = rng.choice([1, 1, 1, 0, SENTINEL], n)
+    df['p_inpvalssnisitinflag'] = (rng.random(n) < 0.02).astype('int64')
+    df['p_inpvalssnnonssaflag'] = (rng.random(n) < 0.05).astype('int64')
+
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kind', choices=['wide', 'pii'], default='pii')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+
+    if args.kind == 'wide':
+        wide_frame(args.rows, args.seed).to_csv(args.out)
+    else:
+        pii_frame(args.rows, args.seed).to_csv(args.out, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,22 @@
 import pandas as pd
 import numpy as np
 import ydata_profiling as ydp
+from eda_tools.correlation_engine import correlation_matrix, pair_correlations, correlation_intervals, CorrelationAccumulator
+from eda_tools.hit_rate_engine import PerformanceKeys
+from eda_tools.instrumentation import instrumented, instrument_methods
 
 
+@instrumented
 def hit_rate(vendor_df, perf_df, left_key, right_key):
     '''
-    Caculate the hit rate of vendor dataset
+    Caculate the hit rate of vendor dataset: the share of performance rows whose key appears in the vendor data
     '''
 
-    # Merge two dataset
-    df = pd.merge(vendor_df, perf_df, left_on=left_key, right_on=right_key, how='inner')
-
-    return df.shape[0] / perf_df.shape[0]
+    # Semi-join on hashed keys; repeated vendor keys don't count a performance row twice
+    return PerformanceKeys(perf_df, right_key).hit_stats(vendor_df, left_key)['hit_rate']
 
 
+@instrumented
 def bad_rate(df, performance):
     '''
     Get the bad rate (performance rate)
@@ -22,14 +25,45 @@ def bad_rate(df, performance):
     return df[df[performance] == 1].shape[0]/df.shape[0]
 
 
+@instrument_methods
 class Correlation():
-    def __init__(self, df, method, threshold = 0.6, columns = None):
+    def __init__(self, df, method, threshold = 0.6, columns = None, n_jobs = None):
         self.df = df
         self.columns = columns
         self.method = method
         self.corr = None
         self.threshold = threshold
         self.high_corr = None
+        self._high_corr_key = None
+        # worker processes for Kendall / Spearman pair blocks, None = all CPUs
+        self.n_jobs = n_jobs
+        # running Pearson statistics, created by update() / from_accumulator()
+        self.accumulator = None
+        # sample estimates and intervals of the pairs checked exactly by approximate_highly_correlated_pairs()
+        self.pair_intervals = None
+
+
+    @classmethod
+    def from_accumulator(cls, accumulator, threshold = 0.6):
+        '''
+        Build a Pearson Correlation from a CorrelationAccumulator (e.g. merged from several chunks or workers)
+        '''
+        corr = cls(None, 'Pearson', threshold, columns = accumulator.columns)
+        corr.accumulator = accumulator
+        corr._set_corr(accumulator.correlation())
+
+        return corr
+
+
+    def _set_corr(self, corr):
+        '''
+        Store a full correlation matrix as the rounded, lower-triangle table
+        '''
+        self.corr = corr.round(2)
+        self.corr = self.corr.mask(np.triu(np.ones(self.corr.shape)).astype(bool))
+        self.high_corr = None
+        self._high_corr_key = None
+
 
     def correlation_table(self):
         '''
@@ -37,23 +71,15 @@ class Correlation():
         '''
 
         try:
-            if self.columns == None:
+            if self.columns is None:
                 self.columns = self.df.columns
 
             methods = ["Pearson", "Spearman", "Kendall"]
 
             if self.method not in methods:
                 raise ValueError("Invalid correlation method. Expected one of: %s" % methods)
-                
-            if self.method == 'Pearson':
-                self.corr = self.df[self.columns].corr(method='pearson')
-            elif self.method == 'Spearman':
-                self.corr = self.df[self.columns].corr(method='spearman')
-            elif self.method == 'Kendall':
-                self.corr = self.df[self.columns].corr(method='kendall')
 
-            self.corr = self.corr.round(2)
-            self.corr = self.corr.mask(np.triu(np.ones(self.corr.shape)).astype(np.bool))
+            self._set_corr(correlation_matrix(self.df[self.columns], method=self.method.lower(), n_jobs=self.n_jobs))
 
         except ValueError as ve:
             print(ve)
@@ -63,20 +89,137 @@ class Correlation():
             return self.corr
 
 
-    def get_highly_correlated_pairs(self):
+    def update(self, new_rows):
+        '''
+        Add newly arrived rows to a Pearson correlation and refresh the table without revisiting earlier rows.
+        The first call seeds the running statistics from self.df; self.df itself is not extended.
+        '''
+        if self.method != 'Pearson':
+            raise ValueError("Incremental updates are only available for the Pearson method")
+
+        if self.accumulator is None:
+            if self.columns is None:
+                self.columns = new_rows.columns if self.df is None else self.df.columns
+            self.accumulator = CorrelationAccumulator(self.columns)
+            if self.df is not None:
+                self.accumulator.update(self.df[self.columns])
+
+        self.accumulator.update(new_rows[self.columns])
+        self._set_corr(self.accumulator.correlation())
+
+        return self.corr
+
+
+    def get_highly_correlated_pairs(self, block_size = 256):
         '''
         Get correlated variable paris whose absolute value is above the threshold
+
+        The masked table is scanned block_size rows at a time and only entries above the threshold are kept,
+        so no p x p long table is built. The result is cached until the table or the threshold changes.
         '''
-        high_corr = self.corr.unstack().dropna()
-        abs_corr = high_corr.abs()
-        self.high_corr = high_corr[abs_corr >= self.threshold]
-        self.high_corr = self.high_corr.sort_values(ascending=False)
-        self.high_corr = self.high_corr.reset_index()
-        self.high_corr.columns = ['Variable 1', 'Variable 2', 'Correlation']
+        key = (id(self.corr), self.threshold)
+        if self.high_corr is not None and self._high_corr_key == key:
+            return self.high_corr
+
+        values = self.corr.to_numpy(dtype='float64')
+        rows, cols = [], []
+        for start in range(0, values.shape[0], block_size):
+            with np.errstate(invalid='ignore'):
+                r, c = np.nonzero(np.abs(values[start:start + block_size]) >= self.threshold)
+            rows.append(r + start)
+            cols.append(c)
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=int)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=int)
+
+        # column-major order, the order unstack() would list them in
+        order = np.lexsort((rows, cols))
+        rows, cols = rows[order], cols[order]
+
+        self.high_corr = pd.DataFrame({
+            'Variable 1': self.corr.columns[cols],
+            'Variable 2': self.corr.index[rows],
+            'Correlation': values[rows, cols],
+        })
+        self.high_corr = self.high_corr.sort_values(by='Correlation', ascending=False)
+        self.high_corr = self.high_corr.reset_index(drop=True)
+        self._high_corr_key = key
 
         return self.high_corr
 
 
+    def approximate_highly_correlated_pairs(self, confidence = 0.99, sample_size = 10000, max_sample_size = 160000, max_exact_pairs = 500, max_kurtosis = 3.0, random_state = 0):
+        '''
+        The pairs of correlation_table() + get_highly_correlated_pairs(), without computing every pair on every row.
+
+        Correlations are estimated on a row sample, with a confidence interval per pair (Bonferroni-adjusted across
+        pairs). Pairs whose interval lies entirely below the threshold are dropped; the rest are recomputed exactly
+        on the full data. The sample doubles, up to max_sample_size, while more than max_exact_pairs pairs remain
+        undecided. Afterwards self.corr holds only the exactly computed pairs and self.pair_intervals their sample
+        estimates and intervals.
+
+        The result is not guaranteed to match the exact path: a pair is missed with probability at most
+        1 - confidence only as far as the normal approximation of the intervals holds. Pearson intervals break
+        down on heavy tails (a few outliers missing from the sample can carry the whole correlation), so for
+        Pearson every pair with a column whose sample excess kurtosis exceeds max_kurtosis is computed exactly,
+        and a sample covering all rows is exact as well.
+        '''
+        methods = ["Pearson", "Spearman", "Kendall"]
+        if self.method not in methods:
+            raise ValueError("Invalid correlation method. Expected one of: %s" % methods)
+        if self.columns is None:
+            self.columns = self.df.columns
+
+        # columns may be given as a list; positions below index into it
+        columns = pd.Index(self.columns)
+        data = self.df[columns]
+        method = self.method.lower()
+        p = len(columns)
+        lower_triangle = np.tril(np.ones((p, p), dtype=bool), k=-1)
+        # the threshold applies to values rounded to two decimals
+        cutoff = self.threshold - 0.005
+        alpha = (1 - confidence) / max(lower_triangle.sum(), 1)
+
+        size = min(sample_size, len(data))
+        while True:
+            sample = data.sample(size, random_state=random_state) if size < len(data) else data
+            estimate = correlation_matrix(sample, method=method, n_jobs=self.n_jobs).to_numpy()
+            present = sample.notna().to_numpy(dtype='float64')
+            lower, upper = correlation_intervals(estimate, present.T @ present, method, 1 - alpha, values=sample.to_numpy(dtype='float64', na_value=np.nan))
+
+            if method == 'pearson':
+                # no trustworthy interval for a heavy-tailed column: its pairs are always checked exactly
+                heavy = (sample.kurt() > max_kurtosis).to_numpy()
+                lower[heavy, :], upper[heavy, :] = -1.0, 1.0
+                lower[:, heavy], upper[:, heavy] = -1.0, 1.0
+
+            # keep every pair that could reach the threshold in absolute value
+            candidate = lower_triangle & ((upper >= cutoff) | (lower <= -cutoff))
+            undecided = candidate & (lower < cutoff) & (upper > -cutoff)
+            if undecided.sum() <= max_exact_pairs or size >= min(max_sample_size, len(data)):
+                break
+            size = min(size * 2, max_sample_size, len(data))
+
+        rows, cols = np.nonzero(candidate)
+        exact = pair_correlations(data, zip(rows, cols), method=method, n_jobs=self.n_jobs)
+
+        corr = np.full((p, p), np.nan)
+        for (i, j), v in exact.items():
+            corr[i, j] = corr[j, i] = v
+        self._set_corr(pd.DataFrame(corr, index=columns, columns=columns))
+
+        self.pair_intervals = pd.DataFrame({
+            'Variable 1': columns[cols],
+            'Variable 2': columns[rows],
+            'Estimate': estimate[rows, cols],
+            'Lower': lower[rows, cols],
+            'Upper': upper[rows, cols],
+            'Correlation': [exact[(i, j)] for i, j in zip(rows, cols)],
+            'Sample Size': size,
+        })
+
+        return self.get_highly_correlated_pairs()
+
+
     def get_directly_correlated_pairs(self):
         '''
         Get the variables that directly correlated, correlation = 1 or -1
@@ -1,16 +1,61 @@
 import pandas as pd
 import numpy as np
 import re
-import plotly.express as px
-
+from eda_tools.columnar_cache import read_columns, read_chunks
+from eda_tools.text_normalize import normalize_frame, duplicate_keys
+from eda_tools.fuzzy_duplicates import fuzzy_duplicates
+from eda_tools.pii_summary import PIISummary
+from eda_tools.compact_schema import compact_frame
+from eda_tools.plots import histogram, state_choropleth
+from eda_tools.reservoir import ReservoirSampler, sample_positions, column_positions, bottom_k, value_keys
+from eda_tools.instrumentation import instrument_methods
+
+# Every column read by PII_EDA; pass as `columns` to load only these
+PII_COLUMNS = [
+    'p_inpacct',
+    'p_inpnamefirst', 'p_inpnamelast', 'p_inpdob', 'pi_inpdobage',
+    'p_inpaddrline1', 'p_inpaddrline2', 'p_inpaddrcity', 'p_inpaddrstate', 'p_inpaddrzip',
+    'p_inpphonehome', 'p_inpssn',
+    'p_inpclnnamefirst', 'p_inpclnnamelast', 'p_inpclnaddrfull', 'p_inpclnaddrstate',
+    'p_inpclnphonehome', 'p_inpclnssn',
+    'p_inpclnnamefirstflag', 'p_inpclnnamelastflag', 'p_inpclnaddrfullflag',
+    'p_inpclnphonehomeflag', 'p_inpclnssnflag', 'p_inpclndobflag',
+    'p_inpvalssnisitinflag', 'p_inpvalssnnonssaflag',
+]
+
+# Rows sampled for the validate_* and *_sample reports: {name: (predicate, columns)}
+VALIDATION_SAMPLES = {
+    'address': (lambda df: (df['p_inpclnaddrfullflag'] == 0) & (df['p_inpacct'] != -99999),
+                ['p_inpacct', 'p_inpaddrline1', 'p_inpaddrline2', 'p_inpaddrcity', 'p_inpaddrstate', 'p_inpaddrzip']),
+    'name': (lambda df: (df['p_inpclnnamefirstflag'] == 0) & (df['p_inpclnnamelastflag'] == 0) & (df['p_inpacct'] != -99999),
+             ['p_inpacct', 'p_inpnamefirst', 'p_inpnamelast']),
+    'DOB': (lambda df: (df['p_inpclndobflag'] == 0) & (df['p_inpacct'] != -99999), ['p_inpacct', 'p_inpdob']),
+    'phone': (lambda df: (df['p_inpclnphonehomeflag'] == 0) & (df['p_inpacct'] != -99999), ['p_inpacct', 'p_inpphonehome']),
+    'ssn': (lambda df: (df['p_inpclnssnflag'] == 0) & (df['p_inpacct'] != -99999), ['p_inpacct', 'p_inpssn']),
+    'ssn_is_itin': (lambda df: df['p_inpvalssnisitinflag'] == 1, ['p_inpacct', 'p_inpssn']),
+    'invalid_ssn': (lambda df: df['p_inpvalssnnonssaflag'] == 1, ['p_inpacct', 'p_inpssn']),
+}
+
+
+@instrument_methods
 class PII_EDA():
 
-    def __init__(self, input_path):
+    def __init__(self, input_path, columns=None, use_cache=False, compact=False, seed=0):
         '''
         Initialize the class
+
+        columns: only load these columns (e.g. PII_COLUMNS); None loads the whole file
+        use_cache: convert the CSV once into a columnar cache next to it and memory-map it on later loads
+        compact: store the columns in compact dtypes (eda_tools.compact_schema): small ints and categorical flags and
+        repeated text. Sentinels are kept as values, so every method gives the same results on much less memory
+        seed: seed of the validation and duplicate samples; the same seed shows the same rows
         '''
+        self._derived = {}
+        self.seed = seed
+        self._samples = None
         try:
-            self.df = pd.read_csv(input_path, low_memory=False)
+            df = read_columns(input_path, columns=columns, use_cache=use_cache)
+            self.df = compact_frame(df) if compact else df
             self.pii = None
             self.pii_flag = None
 
@@ -21,6 +66,77 @@ class PII_EDA():
             print("An error occurred:", e)
 
 
+    @classmethod
+    def from_frame(cls, df, compact=False, seed=0):
+        '''
+        Build from a dataframe already in memory instead of a file
+        '''
+        self = cls.__new__(cls)
+        self._derived = {}
+        self.seed = seed
+        self._samples = None
+        self.df = compact_frame(df) if compact else df
+        self.pii = None
+        self.pii_flag = None
+
+        return self
+
+
+    @classmethod
+    def from_samples(cls, input_path, n=10, seed=0, chunksize=500000, use_cache=True):
+        '''
+        Collect the rows of every validate_* / *_sample report in one streaming pass over a file that is never
+        loaded whole (from the columnar cache if one is current, else the CSV). The instance serves those reports
+        only, with the same rows as a loaded PII_EDA with the same seed.
+        '''
+        self = cls.__new__(cls)
+        self._derived = {}
+        self.seed = seed
+        self._samples = ReservoirSampler.from_chunks(read_chunks(input_path, PII_COLUMNS, chunksize, use_cache), VALIDATION_SAMPLES, n, seed)
+        self.df = None
+        self.pii = None
+        self.pii_flag = None
+
+        return self
+
+
+    @property
+    def df(self):
+        if self._df is None and self._samples is not None:
+            raise AttributeError('This PII_EDA was built by from_samples() and only serves the validate_* / *_sample reports; '
+                                 'load the file with PII_EDA(path) for the other reports')
+        return self._df
+
+
+    @df.setter
+    def df(self, value):
+        self._df = value
+        self.invalidate_cache()
+
+
+    def invalidate_cache(self):
+        '''
+        Drop memoized derived frames. Assigning self.df does this automatically; call it after modifying self.df in place
+        '''
+        self._derived = {}
+
+
+    def _derived_frame(self, name, build):
+        '''
+        Compute a derived frame once per dataset and serve it from the cache afterwards
+        '''
+        # a different object or shape under self.df means the cached frames are stale
+        df = self.df
+        token = (id(df), df.shape)
+        if self._derived.get('_token') != token:
+            self._derived = {'_token': token}
+
+        if name not in self._derived:
+            self._derived[name] = build()
+
+        return self._derived[name]
+
+
     def get_df(self):
         '''
         Return the dataframe
@@ -32,8 +148,14 @@ class PII_EDA():
         '''
         Adjust column names
         '''
-        self.pii = self.df[['p_inpclnaddrfull', 'p_inpclnphonehome', 'p_inpclnssn', 'p_inpclnnamefirst', 'p_inpclnnamelast']]
-        self.pii = self.pii.rename(columns={
+        self.pii = self._derived_frame('pii', self._build_PII_data)
+
+        return self.pii
+
+
+    def _build_PII_data(self):
+        pii = self.df[['p_inpclnaddrfull', 'p_inpclnphonehome', 'p_inpclnssn', 'p_inpclnnamefirst', 'p_inpclnnamelast']]
+        pii = pii.rename(columns={
                 'p_inpclnaddrfull': 'Address',
                 'p_inpclnphonehome': 'Phone',
                 'p_inpclnssn': 'SSN',
@@ -41,15 +163,21 @@ class PII_EDA():
                 'p_inpclnnamelast': 'Last Name'
             })
         
-        return self.pii
+        return pii
     
     
     def get_PII_flags(self):
         '''
         Get the columns with PII flags and rename
         '''
-        self.pii_flag = self.df[['p_inpclnnamefirstflag', 'p_inpclnnamelastflag', 'p_inpclnaddrfullflag', 'p_inpclnphonehomeflag', 'p_inpclnssnflag', 'p_inpclndobflag']]
-        self.pii_flag = self.pii_flag.rename(columns={
+        self.pii_flag = self._derived_frame('pii_flag', self._build_PII_flags)
+
+        return self.pii_flag
+
+
+    def _build_PII_flags(self):
+        pii_flag = self.df[['p_inpclnnamefirstflag', 'p_inpclnnamelastflag', 'p_inpclnaddrfullflag', 'p_inpclnphonehomeflag', 'p_inpclnssnflag', 'p_inpclndobflag']]
+        pii_flag = pii_flag.rename(columns={
                 'p_inpclnaddrfullflag': 'Address',
                 'p_inpclnphonehomeflag': 'Phone',
                 'p_inpclnssnflag': 'SSN',
@@ -58,52 +186,80 @@ class PII_EDA():
                 'p_inpclnnamelastflag': 'Last Name'
             })
         
-        return self.pii_flag
+        return pii_flag
     
 
-    def identify_duplicates(self):
+    def identify_duplicates(self, normalize=False):
         '''
-        Identify duplicated PII info
+        Identify duplicated PII info. The table is computed once per dataset and shared by the duplicate_* reports
+
+        normalize: compare normalized keys (case/whitespace-folded address and names, digits of phone and SSN)
+        instead of raw values; the returned Address/Phone/SSN columns still hold the raw values
         '''
+        name = 'normalized_duplicates' if normalize else 'duplicates'
+
+        return self._derived_frame(name, lambda: self._build_duplicates(normalize))
+
+
+    def _build_duplicates(self, normalize=False):
         # Create duplication table
         ds = self.get_PII_data()
+        address, phone, ssn, name = duplicate_keys(ds, normalize)
+        name_duplicated = name.duplicated()
 
         dupes = ds.assign(
-            Name = lambda x: x['First Name'] + x['Last Name'],
+            Name = name,
             **{
-                'Duplicated Address': lambda x: (x['Address'] != -99999) & (x['Address'] != -99998) & (x['Address'].duplicated()),
-                'Duplicated Phone': lambda x: (x['Phone'] != -99999) & (x['Phone'] != -99998) & x['Phone'].duplicated(),
-                'Duplicated SSN': lambda x: (x['SSN'] != -99999) & (x['SSN'] != -99998) & x['SSN'].duplicated(),
-                'Duplicated Address + Name': lambda x: x['Duplicated Address'] & x.duplicated(subset=['Name']),
-                'Duplicated Phone + Name': lambda x: x['Duplicated Phone'] & x.duplicated(subset=['Name']),
-                'Duplicated SSN + Name': lambda x: x['Duplicated SSN'] & x.duplicated(subset=['Name'])
+                'Duplicated Address': lambda x: (x['Address'] != -99999) & (x['Address'] != -99998) & (address.duplicated()),
+                'Duplicated Phone': lambda x: (x['Phone'] != -99999) & (x['Phone'] != -99998) & phone.duplicated(),
+                'Duplicated SSN': lambda x: (x['SSN'] != -99999) & (x['SSN'] != -99998) & ssn.duplicated(),
+                'Duplicated Address + Name': lambda x: x['Duplicated Address'] & name_duplicated,
+                'Duplicated Phone + Name': lambda x: x['Duplicated Phone'] & name_duplicated,
+                'Duplicated SSN + Name': lambda x: x['Duplicated SSN'] & name_duplicated
             }
         )
 
         return dupes
 
 
+    def identify_fuzzy_duplicates(self, threshold=0.85, window=10):
+        '''
+        Near-duplicate names and addresses ("JOHN SMITH" / "Jon Smith", "123 Main St" / "123 MAIN STREET"),
+        blocked by phonetic codes and state so that only a bounded number of records are compared
+        '''
+        ds = self.get_PII_data()
+        fuzzy = self._derived_frame(
+            ('fuzzy', threshold, window),
+            lambda: fuzzy_duplicates(ds['First Name'], ds['Last Name'], ds['Address'], geo=self.df['p_inpclnaddrstate'], threshold=threshold, window=window)
+        )
+
+        return pd.concat([ds, fuzzy], axis=1)
+
+
+    def identify_batch_duplicates(self, index, batch=None, update=True):
+        '''
+        Flag duplicates against this dataset and every batch already stored in a DuplicateIndex
+        (eda_tools.duplicate_index). With update, this dataset is then added to the index as `batch`.
+        '''
+        pii = self.get_PII_data()
+        flags = index.append(pii, batch) if update else index.flag_batch(pii)
+
+        return pd.concat([pii, flags], axis=1)
+
+
+    def summary(self, chunksize=None):
+        '''
+        Flag hit rates, state counts, age groups and SSN flag tables, computed together in one pass over the
+        needed columns (chunk by chunk if chunksize is given) and shared by the report methods below
+        '''
+        return self._derived_frame('summary', lambda: PIISummary.from_frame(self.df, chunksize))
+
+
     def get_hit_rates(self):
         '''
         Get hit rates for each PII info
         '''    
-        ds = self.get_PII_flags()
-        ds_long = ds.stack().reset_index()
-        ds_long.columns = ['Index', 'Input', 'value']
-        ds_long.drop('Index', axis=1, inplace=True)
-        ds_raw = ds_long[ds_long['value'] != -99999]
-        ds_clean = ds_long[ds_long['value'] == 1]
-
-        raw_count = ds_raw.groupby('Input').count()
-        clean_count = ds_clean.groupby('Input').count()
-        raw_hit_rate = raw_count / ds.shape[0]
-        clean_hit_rate = clean_count / ds.shape[0]
-
-        # make a table for the four columns
-        hit_rate = pd.concat([raw_count, raw_hit_rate, clean_count, clean_hit_rate], axis=1)
-        hit_rate.columns = ['Raw Count', 'Raw Hit Rate', 'Clean Count', 'Cleaned Hit Rate']
-
-        return hit_rate
+        return self.summary().hit_rates()
     
     
     def clean_df(self, x):
@@ -115,17 +271,28 @@ class PII_EDA():
             return re.sub(r"\s+", " ", str(x))
 
 
+    def _sample_rows(self, name, n=10):
+        '''
+        Seeded sample of up to n rows matching VALIDATION_SAMPLES[name], materializing only those rows of its columns
+        '''
+        if self._samples is not None:
+            return self._samples.sample(name)
+
+        predicate, columns = VALIDATION_SAMPLES[name]
+        positions = sample_positions(predicate(self.df), n, self.seed)
+
+        return self.df.iloc[positions, column_positions(self.df, columns)]
+
+
     def validate_address(self):
         '''
         Validate addresses
         '''
-        addr = self.df.copy()
-        addr = addr[(addr['p_inpclnaddrfullflag'] == 0) & (addr['p_inpacct'] != -99999)]
+        addr = self._sample_rows('address')
         
-        if addr.shape[0] > 0:
-            addr = addr[['p_inpacct', 'p_inpaddrline1', 'p_inpaddrline2', 'p_inpaddrcity', 'p_inpaddrstate', 'p_inpaddrzip']].sample(min(10, addr.shape[0]))
+        if len(addr):
             # cleaning address
-            addr_clean = addr.applymap(self.clean_df)
+            addr_clean = normalize_frame(addr)
             addr_clean['Provided Address'] = addr_clean['p_inpaddrline1'] + ' ' + addr_clean['p_inpaddrline2'] + ' ' + addr_clean['p_inpaddrcity'] + ' ' + addr_clean['p_inpaddrstate'] + ' ' + addr_clean['p_inpaddrzip']
             addr_clean = addr_clean.rename(columns={'p_inpacct': 'Account'})
             addr_clean = addr_clean[['Account', 'Provided Address']]
@@ -133,18 +300,20 @@ class PII_EDA():
         
         else:
             return "No address validation issues detected in dataset."
+
+
+    def _state_counts(self):
+        return self.summary().state_counts()
         
     
     def state_distribution(self):
         '''
         Get state distribution
         '''
-        ds = self.df.copy()
-        state_count = ds.loc[~ds['p_inpclnaddrstate'].isin([-99999, -99998]), 'p_inpclnaddrstate'].value_counts().rename_axis('State').reset_index(name='Count')        
-        state_count = state_count.rename(columns={'p_inpclnaddrstate': 'State'})
+        state_count = self._derived_frame('state_count', self._state_counts)
 
-        # plot out the distribution in map
-        fig = px.choropleth(state_count, locations='State', locationmode='USA-states', color='Count', scope='usa')
+        # plot out the distribution in map, one location per state
+        fig = state_choropleth(state_count)
         fig.show()
 
     
@@ -152,12 +321,8 @@ class PII_EDA():
         '''
         Get top *num* states with most PII info, defaults to 10
         '''
-        ds = self.df.copy()
-        state_count = ds.loc[~ds['p_inpclnaddrstate'].isin([-99999, -99998]), 'p_inpclnaddrstate'].value_counts().rename_axis('State').reset_index(name='Count')        
-        state_count = state_count.rename(columns={'p_inpclnaddrstate': 'State'})
+        state_count = self._derived_frame('state_count', self._state_counts)
         state_count = state_count.sort_values(by='Count', ascending=False).head(num)
-        # state_count = state_count.reset_index()
-        # state_count.columns = ['State', 'Count']
 
         return state_count
     
@@ -166,13 +331,11 @@ class PII_EDA():
         '''
         Validate names
         '''
-        name = self.df.copy()
-        name = name[(name['p_inpclnnamefirstflag'] == 0) & (name['p_inpclnnamelastflag'] == 0) & (name['p_inpacct'] != -99999)]
+        name = self._sample_rows('name')
 
-        if name.shape[0] > 0:
+        if len(name):
             # cleaning names
-            name = name[['p_inpacct', 'p_inpnamefirst', 'p_inpnamelast']].sample(min(10, name.shape[0]))
-            name_clean = name.applymap(self.clean_df)
+            name_clean = normalize_frame(name)
             name_clean['Provided First Name'] = name_clean['p_inpnamefirst']
             name_clean['Provided Last Name'] = name_clean['p_inpnamelast']
             name_clean = name_clean.rename(columns={'p_inpacct': 'Account'})
@@ -190,23 +353,22 @@ class PII_EDA():
             DataFrame: A DataFrame containing the account number and provided date of birth for each record with date of birth validation issues.
             str: A message indicating that no date of birth validation issues were detected in the dataset.
         '''
-        dob = self.df.copy()
-        dob = dob[(dob['p_inpclndobflag'] == 0) & (dob['p_inpacct'] != -99999)]
+        dob = self._sample_rows('DOB')
         
-        if dob.shape[0] > 0:
-            dob = dob[['p_inpacct', 'p_inpdob']].sample(min(10, dob.shape[0]))
+        if len(dob):
             return dob
         
         else:
             return "No name validation issues detected in dataset."
 
 
-    def plot_age_distribution(self):
-        age = self.df.copy()
-        age = age[age['pi_inpdobage'] > 0]
+    def plot_age_distribution(self, nbins=20):
+        '''
+        Histogram of the known ages, binned here so the figure carries nbins bars rather than every row
+        '''
+        age = self.df['pi_inpdobage'].to_numpy(dtype='float64', na_value=np.nan)
         
-        fig = px.histogram(age, x='pi_inpdobage', nbins=20)
-        fig.update_layout(xaxis_title='Age', yaxis_title='Count')
+        fig = histogram(age[age > 0], nbins=nbins, x_title='Age', y_title='Count')
         fig.show()
 
 
@@ -214,28 +376,17 @@ class PII_EDA():
         '''
         Get age distribution based on DOB
         '''
-        age = self.df.copy()
-        age = pd.DataFrame(age['pi_inpdobage'])
-        # subgroup age by pi_inpdobage into -99999 -> unavailable, <18 -> <18, 18 -99, 100+
-        age['age_group'] = pd.cut(age['pi_inpdobage'], bins=[-100000, 0, 18, 99, 10000], labels=['Unavailable', '<18', '18-99', '100+'])
-        # group by age_group and count and get precentage and return the dataframe
-        age_count = age.groupby('age_group').count()
-        age_count = age_count.rename(columns={'pi_inpdobage': 'Count'})
-        age_count['Percentage'] = age_count['Count'] / age_count['Count'].sum() * 100
-        age_count = age_count.reset_index()
-
-        return age_count
+        # age groups by pi_inpdobage: -99999 -> unavailable, <18 -> <18, 18 -99, 100+, with count and percentage
+        return self.summary().age_distribution()
 
 
     def validate_phone(self):
         '''
         Validate phone numbers
         '''
-        phone = self.df.copy()
-        phone = phone[(phone['p_inpclnphonehomeflag'] == 0) & (phone['p_inpacct'] != -99999)]
+        phone = self._sample_rows('phone')
         
-        if phone.shape[0] > 0:
-            phone = phone[['p_inpacct', 'p_inpphonehome']].sample(min(10, phone.shape[0]))
+        if len(phone):
             return phone
 
         else:
@@ -246,12 +397,10 @@ class PII_EDA():
         '''
         Validate SSN
         '''
-        ssn = self.df.copy()
-        ssn = ssn[(ssn['p_inpclnssnflag'] == 0) & (ssn['p_inpacct'] != -99999)]
+        ssn = self._sample_rows('ssn')
         
-        if ssn.shape[0] > 0:
-            ssn = ssn[['p_inpacct', 'p_inpssn']].sample(min(10, ssn.shape[0]))
-            ssn_clean = ssn.applymap(self.clean_df)
+        if len(ssn):
+            ssn_clean = normalize_frame(ssn)
             ssn_clean['Provided SSN'] = ssn_clean['p_inpssn']
             ssn_clean = ssn_clean.rename(columns={'p_inpacct': 'Account'})
             ssn_clean = ssn_clean[['Account', 'Provided SSN']]
@@ -259,23 +408,17 @@ class PII_EDA():
         
         else:
             return "No SSN validation issues detected in dataset."
+
+
+    def _flag_table(self, column):
+        return self.summary().flag_table(column)
         
 
     def ssn_is_itin_flag(self):
         '''
         A flag indicating whether input SSN is likely an ITIN.  The following are characteristics of a ITIN when the first digit is 9:
         '''
-        flag = self.df.copy()
-        result = (
-            flag.groupby('p_inpvalssnisitinflag')
-            .size()
-            .reset_index(name='count')
-            .assign(percent_of_records=lambda df: df['count'] / len(flag))
-            .rename(columns={'count': '# of Records'})
-            [['p_inpvalssnisitinflag', '# of Records', 'percent_of_records']]
-        )
-
-        return result
+        return self._flag_table('p_inpvalssnisitinflag')
     
 
     def ssn_is_itin_sample(self):
@@ -283,11 +426,9 @@ class PII_EDA():
         A flag indicating whether input SSN is likely an ITIN.  The following are characteristics of a ITIN when the fourth and fifth digits have '50' - '65', '70' - '88', '90' - '92', or '94' - '99' 
         ''' 
         try:
-            flag = self.df.copy()
             result = (
-                flag[flag['p_inpvalssnisitinflag'] == 1][['p_inpacct', 'p_inpssn']]
+                self._sample_rows('ssn_is_itin')
                 .rename(columns={'p_inpacct': 'Account', 'p_inpssn': 'Provided SSN'})
-                .sample(min(10, flag.shape[0]))
             )
 
             return result
@@ -306,17 +447,7 @@ class PII_EDA():
 
             3) Has '000' at sixth to ninth positions
         '''
-        flag = self.df.copy()
-        result = (
-            flag.groupby('p_inpvalssnnonssaflag')
-            .size()
-            .reset_index(name='count')
-            .assign(percent_of_records=lambda df: df['count'] / len(flag))
-            .rename(columns={'count': '# of Records'})
-            [['p_inpvalssnnonssaflag', '# of Records', 'percent_of_records']]
-        )
-
-        return result
+        return self._flag_table('p_inpvalssnnonssaflag')
     
     
     def invalid_ssn_sample(self):
@@ -324,11 +455,9 @@ class PII_EDA():
         A flag indicating whether input SSN is invalid according to Social Security Administration standards. SSA will not issue a SSN with at least one of the following patterns:
         '''
         try:
-            flag = self.df.copy()
             result = (
-                flag[flag['p_inpvalssnnonssaflag'] == 1][['p_inpacct', 'p_inpssn']]
+                self._sample_rows('invalid_ssn')
                 .rename(columns={'p_inpacct': 'Account', 'p_inpssn': 'Provided SSN'})
-                .sample(min(10, flag.shape[0]))
             )
 
             return result
@@ -349,93 +478,63 @@ class PII_EDA():
         duplicate_sum.index.name = 'PII_field'
         duplicate_sum.reset_index(inplace=True)
         return duplicate_sum
-    
-    
-    def duplicate_address(self):
+
+
+    def _duplicate_rows(self, flag, key, columns, n=5):
         '''
-        A flag indicating whether input address is a duplicate of another address in the dataset.
+        Show every record sharing one of n sampled duplicated `key` values, where `flag` is a column of identify_duplicates().
+        Values are chosen by seeded hash, the same ones ChunkedDuplicates.drilldown picks from the file
         '''
         dupes = self.identify_duplicates()
-        address_dupes = pd.DataFrame(dupes[dupes['Duplicated Address']]['Address'].drop_duplicates().sample(min(5, dupes.shape[0])))
+        values = dupes.loc[dupes[flag], key].drop_duplicates()
+        values = values.iloc[bottom_k(value_keys(values, self.seed), n)]
 
-        data = self.df.copy()
-        data = data[data['p_inpclnaddrfull'].isin(address_dupes['Address'])]
-        data = data[['p_inpacct', 'p_inpclnaddrfull']].rename(columns={'p_inpacct': 'Account', 'p_inpclnaddrfull': 'Address'})
-        data = data.sort_values(by=['Address'])
+        source = {v: k for k, v in columns.items()}[key]
+        data = self.df.loc[self.df[source].isin(values), list(columns)]
+        # categorical columns of a compact frame would sort by category order
+        data = data.astype({c: object for c in data.columns if isinstance(data[c].dtype, pd.CategoricalDtype)})
+        data = data.rename(columns=columns)
+        data = data.sort_values(by=[key])
 
         return data
     
+    
+    def duplicate_address(self):
+        '''
+        A flag indicating whether input address is a duplicate of another address in the dataset.
+        '''
+        return self._duplicate_rows('Duplicated Address', 'Address', {'p_inpacct': 'Account', 'p_inpclnaddrfull': 'Address'})
+    
     def duplicate_address_name(self):
         '''
         A flag indicating whether input address and name is a duplicate of another address and name in the dataset.
         '''
-        dupes = self.identify_duplicates()
-        address_name_dupes = pd.DataFrame(dupes[dupes['Duplicated Address + Name']]['Address'].drop_duplicates().sample(min(5, dupes.shape[0])))
-
-        data = self.df.copy()
-        data = data[data['p_inpclnaddrfull'].isin(address_name_dupes['Address'])]
-        data = data[['p_inpacct', 'p_inpclnaddrfull', 'p_inpclnnamefirst', 'p_inpclnnamelast']].rename(columns={'p_inpacct': 'Account', 'p_inpclnaddrfull': 'Address', 'p_inpclnnamefirst': 'First Name', 'p_inpclnnamelast': 'Last Name'})
-        data = data.sort_values(by=['Address'])
-
-        return data
+        return self._duplicate_rows('Duplicated Address + Name', 'Address', {'p_inpacct': 'Account', 'p_inpclnaddrfull': 'Address', 'p_inpclnnamefirst': 'First Name', 'p_inpclnnamelast': 'Last Name'})
 
 
     def duplicate_phone(self):
         '''
         A flag indicating whether input phone is a duplicate of another phone in the dataset.
         '''
-        dupes = self.identify_duplicates()
-        phone_dupes = pd.DataFrame(dupes[dupes['Duplicated Phone']]['Phone'].drop_duplicates().sample(min(5, dupes.shape[0])))
-
-        data = self.df.copy()
-        data = data[data['p_inpclnphonehome'].isin(phone_dupes['Phone'])]
-        data = data[['p_inpacct', 'p_inpclnphonehome']].rename(columns={'p_inpacct': 'Account', 'p_inpclnphonehome': 'Phone'})
-        data = data.sort_values(by=['Phone'])
-
-        return data
+        return self._duplicate_rows('Duplicated Phone', 'Phone', {'p_inpacct': 'Account', 'p_inpclnphonehome': 'Phone'})
     
 
     def duplicate_phone_name(self):
         '''
         A flag indicating whether input phone and name is a duplicate of another phone and name in the dataset.
         '''
-        dupes = self.identify_duplicates()
-        phone_name_dupes = pd.DataFrame(dupes[dupes['Duplicated Phone + Name']]['Phone'].drop_duplicates().sample(min(5, dupes.shape[0])))
-
-        data = self.df.copy()
-        data = data[data['p_inpclnphonehome'].isin(phone_name_dupes['Phone'])]
-        data = data[['p_inpacct', 'p_inpclnphonehome', 'p_inpclnnamefirst', 'p_inpclnnamelast']].rename(columns={'p_inpacct': 'Account', 'p_inpclnphonehome': 'Phone', 'p_inpclnnamefirst': 'First Name', 'p_inpclnnamelast': 'Last Name'})
-        data = data.sort_values(by=['Phone'])
-
-        return data
+        return self._duplicate_rows('Duplicated Phone + Name', 'Phone', {'p_inpacct': 'Account', 'p_inpclnphonehome': 'Phone', 'p_inpclnnamefirst': 'First Name', 'p_inpclnnamelast': 'Last Name'})
     
 
     def duplicate_SSN(self):
         '''
         A flag indicating whether input SSN is a duplicate of another SSN in the dataset.
         '''
-        dupes = self.identify_duplicates()
-        ssn_dupes = pd.DataFrame(dupes[dupes['Duplicated SSN']]['SSN'].drop_duplicates().sample(min(5, dupes.shape[0])))
-        
-        data = self.df.copy()
-        data = data[data['p_inpclnssn'].isin(ssn_dupes['SSN'])]
-        data = data[['p_inpacct', 'p_inpclnssn']].rename(columns={'p_inpacct': 'Account', 'p_inpclnssn': 'SSN'})
-        data = data.sort_values(by=['SSN'])
-
-        return data
+        return self._duplicate_rows('Duplicated SSN', 'SSN', {'p_inpacct': 'Account', 'p_inpclnssn': 'SSN'})
     
 
     def duplicate_SSN_name(self):
         '''
         A flag indicating whether input SSN and name is a duplicate of another SSN and name in the dataset.
         '''
-        dupes = self.identify_duplicates()
-        ssn_name_dupes = pd.DataFrame(dupes[dupes['Duplicated SSN + Name']]['SSN'].drop_duplicates().sample(min(5, dupes.shape[0])))
-
-        data = self.df.copy()
-        data = data[data['p_inpclnssn'].isin(ssn_name_dupes['SSN'])]
-        data = data[['p_inpacct', 'p_inpclnssn', 'p_inpclnnamefirst', 'p_inpclnnamelast']].rename(columns={'p_inpacct': 'Account', 'p_inpclnssn': 'SSN', 'p_inpclnnamefirst': 'First Name', 'p_inpclnnamelast': 'Last Name'})
-        data = data.sort_values(by=['SSN'])
-
-        return data
-
+        return self._duplicate_rows('Duplicated SSN + Name', 'SSN', {'p_inpacct': 'Account', 'p_inpclnssn': 'SSN', 'p_inpclnnamefirst': 'First Name', 'p_inpclnnamelast': 'Last Name'})
@@ -0,0 +1,292 @@
+'''
+Batch PII / EDA reports over a vendor drop.
+
+For every CSV under the given directories or globs this writes <out>/<name>.json and <out>/<name>.html
+with the PII_EDA summary tables (for files with the PII layout), the missing and exception
+analysis and the highly correlated pairs of the numeric columns, then a cross-vendor comparison
+table <out>/comparison.csv / .html with one row per file. Files are processed on a process pool
+and only as many run at once as fit in --memory-budget; a file whose report was written from the
+same file version and options is skipped.
+
+    python -m eda_tools.batch_report vendors/ --out reports --memory-budget 16G
+    python -m eda_tools.batch_report "drop_2023_*/*.csv" --out reports --workers 4 --force
+'''
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from eda_tools.EDA_tool import Correlation
+from eda_tools.PII_EDA_tool import PII_EDA
+from eda_tools.compact_schema import SENTINELS, compact_frame
+from eda_tools.job_runner import PII_REPORT_SECTIONS, file_job_key
+from eda_tools.missing_analysis import column_stats, top_exception_variables, top_missing_variables
+from eda_tools.pii_summary import FLAG_COLUMNS
+
+
+# peak memory of build_report per byte of CSV, used to size the pool to the memory budget. The peak is
+# the load: parsing the CSV (about 4.5x the file for the PII layout) plus the compacted copy built from it
+# (about 1.2x); measured at 6.2x on a 100k-row PII file, so this leaves some headroom
+MEMORY_PER_BYTE = 8
+
+REPORT_VERSION = 1
+
+
+def find_files(inputs, pattern='*.csv'):
+    '''
+    CSV files named by a list of files, directories (searched recursively for `pattern`) and globs
+    '''
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files += glob.glob(os.path.join(item, '**', pattern), recursive=True)
+        else:
+            files += glob.glob(item)
+
+    return sorted(set(os.path.abspath(f) for f in files if os.path.isfile(f)))
+
+
+def parse_size(text):
+    '''
+    '16G', '512M', '2.5g' or a plain number of bytes
+    '''
+    units = {'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30, 'T': 2 ** 40}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+
+    return int(float(text))
+
+
+def estimate_memory(path):
+    return os.path.getsize(path) * MEMORY_PER_BYTE
+
+
+def report_name(path, files):
+    '''
+    Artifact name of a file: its base name, prefixed by its parent directory when two inputs share a base name
+    '''
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if sum(os.path.splitext(os.path.basename(f))[0] == stem for f in files) > 1:
+        stem = f'{os.path.basename(os.path.dirname(path))}_{stem}'
+
+    return stem
+
+
+def _table(df):
+    return json.loads(df.to_json(orient='split', date_format='iso', default_handler=str))
+
+
+def _pii_summary(tables, rows):
+    # clean hit rate per PII field and duplicate rate per duplicate check
+    summary = {}
+    if 'Hit Rates' in tables:
+        hit_rates = tables['Hit Rates']['Cleaned Hit Rate']
+        summary.update({f'{field} Hit Rate': rate for field, rate in hit_rates.items()})
+    if 'Duplicated PII' in tables:
+        dupes = tables['Duplicated PII'].set_index('PII_field')['Count']
+        summary.update({f'{field} Rate': count / rows for field, count in dupes.items()})
+
+    return summary
+
+
+def _numeric_columns(df, exception_values):
+    '''
+    float64 copy of the non-constant numeric columns (compacted flag categoricals included), sentinels as NaN
+    '''
+    numeric = {}
+    for column in df.columns:
+        s = df[column]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            if not pd.api.types.is_numeric_dtype(s.cat.categories.dtype):
+                continue
+        elif not pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype):
+            continue
+        if s.nunique() <= 1:
+            continue
+        values = s.to_numpy(dtype='float64', na_value=np.nan)
+        # sentinels are missing values here, not numbers to correlate
+        values[np.isin(values, exception_values)] = np.nan
+        numeric[column] = values
+
+    return pd.DataFrame(numeric, index=df.index)
+
+
+def build_report(path, threshold=0.6, method='Pearson', exception_values=SENTINELS, top=50):
+    '''
+    Summary tables and headline numbers of one vendor file
+    '''
+    # compacted once as it is loaded, so the parsed frame is gone before any report works on the data
+    df = compact_frame(pd.read_csv(path, low_memory=False))
+    tables = {}
+    summary = {'rows': len(df), 'columns': df.shape[1]}
+
+    # PII layout: the PII_EDA report sections
+    if set(FLAG_COLUMNS) <= set(df.columns):
+        pii = PII_EDA.from_frame(df)
+        for title, method_name in PII_REPORT_SECTIONS:
+            tables[title] = getattr(pii, method_name)()
+        summary.update(_pii_summary(tables, len(df)))
+
+    stats = column_stats(df, exception_values)
+    tables['Top Missing Variables'] = top_missing_variables(stats, top)
+    tables['Top Exception Variables'] = top_exception_variables(stats, exception_values, top)
+    null_rate = stats.null_rate()
+    summary['mean null rate'] = float(null_rate.mean()) if len(null_rate) else 0.0
+    summary['columns > 50% null'] = int((null_rate > 0.5).sum())
+    summary['mean exception rate'] = float(stats.exception_rate().mean()) if len(null_rate) else 0.0
+
+    numeric = _numeric_columns(df, exception_values)
+    if numeric.shape[1] > 1:
+        # already inside a pool worker: no nested pool for the rank correlations
+        corr = Correlation(numeric, method, threshold, n_jobs=1)
+        corr.correlation_table()
+        tables['Highly Correlated Pairs'] = corr.get_highly_correlated_pairs()
+        summary['highly correlated pairs'] = len(tables['Highly Correlated Pairs'])
+
+    return tables, summary
+
+
+def render_html(name, tables, summary):
+    sections = [f'<h1>{name}</h1>', pd.Series(summary, name='value').to_frame().to_html()]
+    for title, table in tables.items():
+        sections.append(f'<h2>{title}</h2>')
+        sections.append(table.to_html(index=False) if isinstance(table, pd.DataFrame) else f'<p>{table}</p>')
+
+    return '<html><head><meta charset="utf-8"></head><body>\n' + '\n'.join(sections) + '\n</body></html>\n'
+
+
+def _write(path, text):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def artifact_paths(out_dir, name):
+    return os.path.join(out_dir, f'{name}.json'), os.path.join(out_dir, f'{name}.html')
+
+
+def read_current(path, out_dir, name, options):
+    '''
+    The stored report of `path` if it was written from this version of the file with these options, else None
+    '''
+    json_path, html_path = artifact_paths(out_dir, name)
+    if not (os.path.exists(json_path) and os.path.exists(html_path)):
+        return None
+    try:
+        with open(json_path) as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    return report if report.get('key') == file_job_key('batch_report', path, version=REPORT_VERSION, **options) else None
+
+
+def report_file(path, out_dir, name, options):
+    '''
+    Build and write the JSON and HTML report of one file; returns its summary row (runs in a worker process)
+    '''
+    start = time.perf_counter()
+    tables, summary = build_report(path, **options)
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+
+    report = {
+        'file': path,
+        'key': file_job_key('batch_report', path, version=REPORT_VERSION, **options),
+        'summary': summary,
+        'tables': {title: _table(t) if isinstance(t, pd.DataFrame) else t for title, t in tables.items()},
+    }
+    json_path, html_path = artifact_paths(out_dir, name)
+    _write(html_path, render_html(name, tables, summary))
+    # the JSON goes last: its key marks the report as complete
+    _write(json_path, json.dumps(report, indent=2, default=str))
+
+    return summary
+
+
+def run_batch(files, out_dir, memory_budget, workers=None, force=False, options=None, log=print):
+    '''
+    Report every file, running as many at once as fit in memory_budget; returns the comparison table and the failed files
+    '''
+    options = options or {}
+    os.makedirs(out_dir, exist_ok=True)
+    names = {f: report_name(f, files) for f in files}
+    summaries, failed = {}, {}
+
+    pending = []
+    for f in files:
+        current = None if force else read_current(f, out_dir, names[f], options)
+        if current is not None:
+            summaries[f] = current['summary']
+            log(f'up to date  {names[f]}')
+        else:
+            pending.append(f)
+
+    # largest first, so the big files aren't left to run alone at the end
+    pending.sort(key=estimate_memory, reverse=True)
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while pending or running:
+            in_use = sum(estimate_memory(f) for f in running.values())
+            # admit files while they fit; one file always runs, even if it alone exceeds the budget
+            for f in list(pending):
+                if len(running) >= workers:
+                    break
+                if running and in_use + estimate_memory(f) > memory_budget:
+                    continue
+                running[pool.submit(report_file, f, out_dir, names[f], options)] = f
+                in_use += estimate_memory(f)
+                pending.remove(f)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                f = running.pop(future)
+                try:
+                    summaries[f] = future.result()
+                    log(f'done        {names[f]} ({summaries[f]["seconds"]}s)')
+                except Exception as e:
+                    failed[f] = repr(e)
+                    log(f'failed      {names[f]}: {e!r}')
+
+    comparison = pd.DataFrame.from_dict({names[f]: summaries[f] for f in files if f in summaries}, orient='index')
+    comparison.index.name = 'file'
+    _write(os.path.join(out_dir, 'comparison.csv'), comparison.to_csv())
+    _write(os.path.join(out_dir, 'comparison.html'), render_html('Vendor comparison', {'Files': comparison.reset_index()}, {'files': len(files), 'failed': len(failed)}))
+
+    return comparison, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='CSV files, directories or globs')
+    parser.add_argument('--out', default='batch_reports', help='directory for the reports')
+    parser.add_argument('--memory-budget', default='8G', help='memory the concurrent reports may use, e.g. 16G')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all CPUs)')
+    parser.add_argument('--pattern', default='*.csv', help='file pattern searched for in directories')
+    parser.add_argument('--threshold', type=float, default=0.6, help='absolute correlation reported as high')
+    parser.add_argument('--method', default='Pearson', choices=['Pearson', 'Spearman', 'Kendall'])
+    parser.add_argument('--force', action='store_true', help='rebuild reports that are already current')
+    args = parser.parse_args(argv)
+
+    files = find_files(args.inputs, args.pattern)
+    if not files:
+        parser.error('no input files found')
+
+    options = {'threshold': args.threshold, 'method': args.method}
+    comparison, failed = run_batch(files, args.out, parse_size(args.memory_budget), args.workers, args.force, options)
+    print(comparison.to_string())
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
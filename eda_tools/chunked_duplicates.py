@@ -0,0 +1,236 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from eda_tools.instrumentation import instrumented, instrument_methods
+from eda_tools.reservoir import bottom_k, value_keys
+
+## Out-of-core version of PII_EDA.identify_duplicates / duplicate_PII for files larger than RAM.
+##
+## Pass 1 streams the CSV in chunks and spills (row number, key hash) records for address, phone,
+## SSN and name into hash partitions on local disk. Pass 2 resolves each partition on its own:
+## every occurrence of a key after the first is a duplicate, exactly like pandas' duplicated().
+## Per-row flags live in memory-mapped files, so memory stays bounded by the chunk size and the
+## largest partition.
+
+
+FIELDS = {'Address': 'p_inpclnaddrfull', 'Phone': 'p_inpclnphonehome', 'SSN': 'p_inpclnssn'}
+NAME_COLUMNS = ['p_inpclnnamefirst', 'p_inpclnnamelast']
+SENTINELS = [-99999, -99998]
+
+SPILL_DTYPE = np.dtype([('row', '<i8'), ('canonical', '<u8'), ('raw', '<u8'), ('sentinel', '?')])
+
+
+def _hash(values):
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+@instrument_methods
+class ChunkedDuplicates():
+    '''
+    Streaming duplicate detection over a CSV. Produces the same counts and hit rates as PII_EDA.duplicate_PII.
+    '''
+
+    def __init__(self, input_path, chunksize=500000, partitions=64, spill_dir=None):
+        self.input_path = input_path
+        self.chunksize = chunksize
+        self.partitions = partitions
+        self.spill_dir = spill_dir
+        self.rows = None
+        self.numeric = None
+        self.flags = None
+        self._workdir = None
+
+
+    def _chunks(self, columns):
+        # keep the raw text so values compare the same way whichever chunk they land in
+        return pd.read_csv(self.input_path, usecols=columns, dtype=str, chunksize=self.chunksize)
+
+
+    def _spill_path(self, key, partition):
+        return os.path.join(self._workdir, f'{key}-{partition:04d}.bin')
+
+
+    def run(self):
+        '''
+        Run both passes and keep per-row duplicate flags on disk
+        '''
+        self._workdir = tempfile.mkdtemp(prefix='pii_dupes_', dir=self.spill_dir)
+        keys = list(FIELDS) + ['Name']
+        self.numeric = {k: True for k in FIELDS}
+
+        # Pass 1: hash-partition the keys into spill files
+        handles = {(k, p): open(self._spill_path(k, p), 'ab') for k in keys for p in range(self.partitions)}
+        try:
+            offset = 0
+            for chunk in self._chunks(list(FIELDS.values()) + NAME_COLUMNS):
+                rows = np.arange(offset, offset + len(chunk), dtype='int64')
+                offset += len(chunk)
+
+                for key in keys:
+                    if key == 'Name':
+                        values = chunk[NAME_COLUMNS[0]] + chunk[NAME_COLUMNS[1]]
+                        canonical = raw = _hash(values)
+                        sentinel = np.zeros(len(chunk), dtype=bool)
+                    else:
+                        values = chunk[FIELDS[key]]
+                        number = pd.to_numeric(values, errors='coerce')
+                        is_number = number.notna().to_numpy()
+                        # a column is compared numerically by pandas only if every value parses as a number
+                        self.numeric[key] &= bool((is_number | values.isna().to_numpy()).all())
+                        raw = _hash(values)
+                        canonical = np.where(is_number, _hash(number.astype('float64')), raw)
+                        sentinel = number.isin(SENTINELS).to_numpy()
+
+                    records = np.empty(len(chunk), dtype=SPILL_DTYPE)
+                    records['row'] = rows
+                    records['canonical'] = canonical
+                    records['raw'] = raw
+                    records['sentinel'] = sentinel
+
+                    part = canonical % self.partitions
+                    for p in np.unique(part):
+                        records[part == p].tofile(handles[(key, p)])
+        finally:
+            for h in handles.values():
+                h.close()
+
+        self.rows = offset
+
+        # Pass 2: resolve duplicates partition by partition
+        self.flags = {}
+        for key in keys:
+            flags = np.memmap(os.path.join(self._workdir, f'{key}.flags'), dtype=bool, mode='w+', shape=(max(self.rows, 1),))
+            # numeric columns compare by value (5551234567 == 5551234567.0) and skip sentinels;
+            # text columns compare the raw strings, as pandas does on an object column
+            numeric = key != 'Name' and self.numeric[key]
+
+            for p in range(self.partitions):
+                records = np.fromfile(self._spill_path(key, p), dtype=SPILL_DTYPE)
+                os.remove(self._spill_path(key, p))
+                if len(records) == 0:
+                    continue
+
+                hashes = records['canonical'] if numeric else records['raw']
+                order = np.lexsort((records['row'], hashes))
+                hashes = hashes[order]
+                repeated = np.concatenate([[False], hashes[1:] == hashes[:-1]])
+                dupes = records[order][repeated]
+                if numeric:
+                    dupes = dupes[~dupes['sentinel']]
+                flags[dupes['row']] = True
+
+            flags.flush()
+            self.flags[key] = flags
+
+        return self
+
+
+    def duplicate_flags(self, field, start=0, stop=None):
+        '''
+        Per-row flag for one of the duplicate_PII fields (e.g. 'Duplicated Phone + Name') over rows start:stop
+        '''
+        if self.flags is None:
+            self.run()
+
+        stop = self.rows if stop is None else min(stop, self.rows)
+        key = field.replace('Duplicated ', '').replace(' + Name', '')
+        flags = self.flags[key][start:stop]
+        if field.endswith('+ Name'):
+            flags = flags & self.flags['Name'][start:stop]
+
+        return flags
+
+
+    def count(self, field):
+        '''
+        Number of rows flagged for `field`, summed block by block
+        '''
+        if self.flags is None:
+            self.run()
+
+        return sum(int(self.duplicate_flags(field, i, i + self.chunksize).sum()) for i in range(0, self.rows, self.chunksize))
+
+
+    def summary(self):
+        '''
+        Same table as PII_EDA.duplicate_PII
+        '''
+        fields = ['Duplicated Address', 'Duplicated Phone', 'Duplicated SSN',
+                  'Duplicated Address + Name', 'Duplicated Phone + Name', 'Duplicated SSN + Name']
+        counts = pd.Series({f: self.count(f) for f in fields})
+        # a header-only file has no rows to be duplicated
+        percents = (counts / max(self.rows, 1) * 100).apply(lambda x: f'{x:.2f}%')
+        duplicate_sum = pd.DataFrame({'Count': counts, 'Hit_Rate': percents})
+        duplicate_sum.index.name = 'PII_field'
+        duplicate_sum.reset_index(inplace=True)
+
+        return duplicate_sum
+
+
+    def drilldown(self, field, n=5, seed=0):
+        '''
+        Records sharing one of n duplicated values of `field`, in the layout of the PII_EDA.duplicate_* reports.
+        Values are chosen by seeded hash in one pass (eda_tools.reservoir), the same ones PII_EDA picks with that seed.
+        '''
+        if self.flags is None:
+            self.run()
+
+        key = field.replace('Duplicated ', '').replace(' + Name', '')
+        column = FIELDS[key]
+        columns = {'p_inpacct': 'Account', column: key}
+        if field.endswith('+ Name'):
+            columns.update({'p_inpclnnamefirst': 'First Name', 'p_inpclnnamelast': 'Last Name'})
+
+        values = pd.Series([], dtype='float64' if self.numeric[key] else object)
+        offset = 0
+        for chunk in self._chunks([column]):
+            flags = self.duplicate_flags(field, offset, offset + len(chunk))
+            offset += len(chunk)
+            flagged = chunk.loc[flags, column]
+            if self.numeric[key]:
+                flagged = pd.to_numeric(flagged).astype('float64')
+            # the chunk's flagged values against the n kept so far
+            values = pd.concat([values, flagged], ignore_index=True).drop_duplicates()
+            values = values.iloc[bottom_k(value_keys(values, seed), n)]
+
+        data = [pd.DataFrame(columns=list(columns), dtype=str)]
+        for chunk in self._chunks(list(columns)):
+            keys = pd.to_numeric(chunk[column]) if self.numeric[key] else chunk[column]
+            data.append(chunk[keys.isin(values)])
+        data = pd.concat(data)[list(columns)].rename(columns=columns)
+        # chunks are read as text; numeric columns get back the dtypes a plain read_csv gives them
+        for c in data.columns:
+            if c == key and not self.numeric[key]:
+                continue
+            try:
+                data[c] = pd.to_numeric(data[c])
+            except (ValueError, TypeError):
+                pass
+
+        return data.sort_values(by=[key])
+
+
+    def cleanup(self):
+        '''
+        Remove the spill directory
+        '''
+        self.flags = None
+        if self._workdir is not None:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+
+
+@instrumented
+def duplicate_PII_chunked(input_path, chunksize=500000, partitions=64, spill_dir=None):
+    '''
+    Out-of-core equivalent of PII_EDA(input_path).duplicate_PII()
+    '''
+    dupes = ChunkedDuplicates(input_path, chunksize, partitions, spill_dir)
+    try:
+        return dupes.run().summary()
+    finally:
+        dupes.cleanup()
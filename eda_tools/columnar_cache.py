@@ -0,0 +1,151 @@
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+except ImportError:  # pragma: no cover - pyarrow ships with streamlit, but keep CSV-only mode working
+    pa = None
+
+from eda_tools.instrumentation import instrumented
+
+## Columnar cache for CSV inputs: <file>.csv -> <file>.csv.feather next to the source
+
+
+METADATA_KEY = b'eda_tools.source'
+
+
+def cache_path(input_path):
+    '''
+    Location of the columnar cache file for a CSV
+    '''
+    return f'{input_path}.feather'
+
+
+def source_signature(input_path, csv_kwargs=None):
+    '''
+    Size and modification time of the source plus the parse options, used to invalidate the cache
+    '''
+    st = os.stat(input_path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'read_csv': repr(sorted((csv_kwargs or {}).items()))}
+
+
+def is_current(input_path, csv_kwargs=None):
+    '''
+    Check whether the columnar cache exists and was built from the current source
+    '''
+    if pa is None:
+        return False
+
+    path = cache_path(input_path)
+    if not os.path.exists(path):
+        return False
+
+    try:
+        with pa.memory_map(path, 'r') as source:
+            metadata = ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+
+    recorded = metadata.get(METADATA_KEY)
+    return recorded is not None and json.loads(recorded) == source_signature(input_path, csv_kwargs)
+
+
+@instrumented
+def build_cache(input_path, **csv_kwargs):
+    '''
+    Parse the CSV once and write it as an uncompressed Feather (Arrow IPC) file so that
+    later reads can memory-map individual columns
+    '''
+    signature = source_signature(input_path, csv_kwargs)
+    df = pd.read_csv(input_path, **{'low_memory': False, **csv_kwargs})
+
+    table = pa.Table.from_pandas(df)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(signature).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    path = cache_path(input_path)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    feather.write_feather(table, tmp, compression='uncompressed')
+    os.replace(tmp, path)
+
+    return df
+
+
+@instrumented
+def read_columns(input_path, columns=None, use_cache=True, **csv_kwargs):
+    '''
+    Load a CSV, optionally projected to `columns`.
+
+    With `use_cache`, the first call converts the CSV into a columnar cache next to the
+    source; later calls memory-map only the requested columns. The cache is rebuilt when
+    the source's size or modification time changes. Requested columns that do not exist
+    in the file are skipped. Falls back to plain `pd.read_csv` if pyarrow is unavailable
+    or the cache cannot be written.
+    '''
+    wanted = None if columns is None else set(columns)
+
+    if use_cache and pa is not None:
+        try:
+            if not is_current(input_path, csv_kwargs):
+                df = build_cache(input_path, **csv_kwargs)
+                return df if wanted is None else df[[c for c in df.columns if c in wanted]]
+
+            path = cache_path(input_path)
+            projection = None
+            if wanted is not None:
+                with pa.memory_map(path, 'r') as source:
+                    schema = ipc.open_file(source).schema
+                # keep serialized index columns so the frame comes back with its original index
+                index_columns = [c for c in (schema.pandas_metadata or {}).get('index_columns', []) if isinstance(c, str)]
+                projection = [c for c in schema.names if c in wanted or c in index_columns]
+
+            return feather.read_table(path, columns=projection, memory_map=True).to_pandas()
+
+        except OSError as e:
+            print("Columnar cache unavailable, reading CSV directly:", e)
+
+        except pa.ArrowException as e:
+            # a corrupt or schema-mismatched cache: drop it so the next load rebuilds it
+            print("Columnar cache unreadable, reading CSV directly:", e)
+            try:
+                os.remove(cache_path(input_path))
+            except OSError:
+                pass
+
+    csv_kwargs.setdefault('low_memory', False)
+    if wanted is not None:
+        csv_kwargs['usecols'] = lambda c: c in wanted
+
+    return pd.read_csv(input_path, **csv_kwargs)
+
+
+def read_chunks(input_path, columns=None, chunksize=500000, use_cache=True, **csv_kwargs):
+    '''
+    Iterate over a CSV in chunks of `chunksize` rows, optionally projected to `columns`.
+
+    With `use_cache` and a current columnar cache, each chunk is a slice of the memory-mapped
+    cache; otherwise the CSV is streamed. The cache is never built here, since that parses the
+    whole file at once.
+    '''
+    wanted = None if columns is None else set(columns)
+
+    if use_cache and is_current(input_path, csv_kwargs):
+        with pa.memory_map(cache_path(input_path), 'r') as source:
+            table = ipc.open_file(source).read_all()
+            if wanted is not None:
+                index_columns = [c for c in (table.schema.pandas_metadata or {}).get('index_columns', []) if isinstance(c, str)]
+                table = table.select([c for c in table.schema.names if c in wanted or c in index_columns])
+            for start in range(0, table.num_rows, chunksize):
+                yield table.slice(start, chunksize).to_pandas()
+        return
+
+    csv_kwargs.setdefault('low_memory', False)
+    if wanted is not None:
+        csv_kwargs['usecols'] = lambda c: c in wanted
+
+    yield from pd.read_csv(input_path, chunksize=chunksize, **csv_kwargs)
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+from eda_tools.instrumentation import instrumented
+
+## Compact in-memory schema for vendor data. Parsed CSVs come back as float64 / int64 / object
+## columns; most of them hold small integers, 0/1 flags or a handful of codes, with -99999 / -99998
+## standing in for missing values. compact_frame stores each column in the smallest dtype that
+## keeps its values (sentinels included, so comparisons against them still work), and
+## mask_sentinels turns the sentinels into real missing values with a per-cell record of which
+## sentinel was there.
+
+
+SENTINELS = [-99999, -99998]
+
+_INT_DTYPES = ['int8', 'int16', 'int32', 'int64']
+
+
+def _int_dtype(low, high):
+    '''
+    Smallest signed integer dtype holding every value in [low, high]
+    '''
+    for dtype in _INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return 'int64'
+
+
+def _sentinel_mask(s, sentinel):
+    # text columns read from CSV carry the sentinel as text
+    if pd.api.types.is_object_dtype(s.dtype) or isinstance(s.dtype, pd.CategoricalDtype):
+        return s.isin([sentinel, str(sentinel)]).to_numpy()
+    return (s == sentinel).fillna(False).to_numpy(dtype=bool)
+
+
+def _is_flag(values, sentinels):
+    # 0/1 flags with sentinels need an int32 for -99999; as a category they take one byte
+    present = pd.unique(values[~np.isnan(values)])
+    return len(present) <= 2 + len(sentinels) and set(present) <= {0, 1, *sentinels} and bool(set(present) & set(sentinels))
+
+
+def infer_dtypes(df, sentinels=SENTINELS, categories=(), max_category_ratio=0.5):
+    '''
+    Compact dtype for every column of df that can be stored smaller:
+
+        - integer columns, and float columns holding only whole numbers, become the smallest int
+          dtype (nullable 'Int8' ... 'Int64' when there are NaN)
+        - 0/1 flag columns that also hold sentinels become categoricals
+        - text columns with at most max_category_ratio distinct values per row (states, cities,
+          first names, ...) and any column listed in `categories` become categoricals
+
+    Floats with fractional values and mostly-distinct text are left as they are.
+    '''
+    dtypes = {}
+    for column in df.columns:
+        s = df[column]
+        if column in categories:
+            dtypes[column] = 'category'
+            continue
+        if pd.api.types.is_object_dtype(s.dtype):
+            if s.nunique() <= max_category_ratio * len(s):
+                dtypes[column] = 'category'
+            continue
+        if not pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype) or isinstance(s.dtype, pd.CategoricalDtype):
+            continue
+
+        values = s.to_numpy(dtype='float64', na_value=np.nan)
+        valid = values[~np.isnan(values)]
+        if len(valid) == 0 or not np.array_equal(valid, np.round(valid)):
+            continue
+
+        if _is_flag(values, sentinels):
+            dtypes[column] = 'category'
+            continue
+
+        dtype = _int_dtype(valid.min(), valid.max())
+        if len(valid) < len(values):
+            dtype = dtype.capitalize()
+        if dtype != s.dtype:
+            dtypes[column] = dtype
+
+    return dtypes
+
+
+@instrumented
+def compact_frame(df, sentinels=SENTINELS, categories=(), max_category_ratio=0.5):
+    '''
+    df with the dtypes from infer_dtypes; values, sentinels included, compare equal to the original
+    '''
+    dtypes = infer_dtypes(df, sentinels, categories, max_category_ratio)
+
+    return df.astype(dtypes) if dtypes else df
+
+
+def sentinel_counts(df, sentinels=SENTINELS):
+    '''
+    Number of cells holding each sentinel, per column that has any
+    '''
+    counts = pd.DataFrame({s: [_sentinel_mask(df[c], s).sum() for c in df.columns] for s in sentinels}, index=df.columns)
+
+    return counts[counts.sum(axis=1) > 0]
+
+
+class SentinelCodes():
+    '''
+    Which sentinel each masked cell held: codes[column][row] is 0 for a real value (or a genuine NaN)
+    and i + 1 for sentinels[i]. Only columns that had sentinels are kept.
+    '''
+
+    def __init__(self, codes, sentinels=SENTINELS):
+        self.codes = codes
+        self.sentinels = list(sentinels)
+
+
+    def counts(self):
+        '''
+        Number of cells that held each sentinel, per column
+        '''
+        return pd.DataFrame({s: (self.codes == i + 1).sum() for i, s in enumerate(self.sentinels)}, index=self.codes.columns)
+
+
+    def mask(self, sentinel):
+        '''
+        Boolean frame of the cells that held `sentinel`
+        '''
+        return self.codes == self.sentinels.index(sentinel) + 1
+
+
+    def restore(self, df):
+        '''
+        Put the recorded sentinels back into a masked frame
+        '''
+        df = df.copy()
+        for column in self.codes.columns:
+            s = df[column]
+            codes = self.codes[column].to_numpy()
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                s = s.cat.add_categories([v for v in self.sentinels if v not in s.cat.categories])
+            for i, sentinel in enumerate(self.sentinels):
+                s = s.mask(codes == i + 1, sentinel)
+            df[column] = s
+
+        return df
+
+
+@instrumented
+def mask_sentinels(df, sentinels=SENTINELS):
+    '''
+    Replace sentinel values by missing values, keeping integer columns as nullable integers.
+    Returns the masked frame and the SentinelCodes recording which sentinel each masked cell held.
+    '''
+    df = df.copy()
+    codes = {}
+    for column in df.columns:
+        s = df[column]
+        code = np.zeros(len(s), dtype=np.int8)
+        for i, sentinel in enumerate(sentinels):
+            code[_sentinel_mask(s, sentinel)] = i + 1
+        if not code.any():
+            continue
+
+        if pd.api.types.is_integer_dtype(s.dtype) and not pd.api.types.is_extension_array_dtype(s.dtype):
+            s = s.astype(s.dtype.name.capitalize())
+        s = s.mask(code > 0)
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            forms = set(sentinels) | {str(v) for v in sentinels}
+            s = s.cat.remove_categories([v for v in s.cat.categories if v in forms])
+        df[column] = s
+        codes[column] = code
+
+    return df, SentinelCodes(pd.DataFrame(codes, index=df.index), sentinels)
@@ -0,0 +1,348 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import kendalltau, norm, rankdata
+
+from eda_tools.instrumentation import instrumented
+
+## Correlation engine for wide frames, consistent with DataFrame.corr (pairwise-complete rows, min_periods).
+##
+## Pearson is computed for all pairs at once from matrix products over the zero-filled, centered data
+## and its missingness mask. Spearman ranks every column once and reuses the Pearson path; only pairs
+## touching a column with missing values are re-ranked on their complete rows, as pandas does. Kendall
+## uses scipy's O(n log n) tau-b per pair. Per-pair work is split into column blocks and spread over a
+## process pool that reads the data from a shared memory-mapped file.
+
+
+METHODS = ['pearson', 'spearman', 'kendall']
+
+# below this many (pairs x rows) the pool start-up costs more than it saves
+PARALLEL_MIN_WORK = 20000000
+
+
+def _as_matrix(df):
+    return df.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def pearson_matrix(values, min_periods=1):
+    '''
+    Pairwise-complete Pearson correlation of the columns of a 2-D float array
+    '''
+    mask = ~np.isnan(values)
+    # centering first keeps the one-pass sums well conditioned
+    counts = mask.sum(axis=0)
+    means = np.where(mask, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    x = np.where(mask, values - means, 0.0)
+    m = mask.astype('float64')
+
+    if mask.all():
+        n = np.full((values.shape[1], values.shape[1]), float(values.shape[0]))
+        sxy = x.T @ x
+        sxx = np.diag(sxy)[:, None] * np.ones_like(sxy)
+        sx = np.zeros_like(sxy)
+    else:
+        n = m.T @ m
+        sx = x.T @ m
+        sxx = (x * x).T @ m
+        sxy = x.T @ x
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sx.T / n
+        var_x = sxx - sx * sx / n
+        var_y = var_x.T
+        corr = cov / np.sqrt(var_x * var_y)
+
+    # constant columns (on the pair's rows) have no correlation, like pandas
+    tiny = np.finfo('float64').eps * 64
+    degenerate = (var_x <= tiny * sxx) | (var_y <= tiny * sxx.T) | (n < max(min_periods, 1))
+    corr[degenerate] = np.nan
+
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _pair_value(method, x, y, min_periods, same):
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if valid.sum() < min_periods:
+        return np.nan
+    if not valid.all():
+        x, y = x[valid], y[valid]
+
+    if method == 'kendall':
+        return 1.0 if same else kendalltau(x, y)[0]
+
+    # spearman correlates the ranks of the pair's complete rows
+    rx, ry = (x, y) if method == 'pearson' else (rankdata(x), rankdata(y))
+    rx, ry = rx - rx.mean(), ry - ry.mean()
+    denom = np.sqrt((rx * rx).sum() * (ry * ry).sum())
+    return np.nan if denom == 0 else float(np.clip((rx * ry).sum() / denom, -1.0, 1.0))
+
+
+def _pair_block(path, method, pairs, min_periods):
+    '''
+    Worker: compute a block of column pairs from the shared memory-mapped matrix
+    '''
+    values = np.load(path, mmap_mode='r')
+    columns = {}
+
+    def column(i):
+        if i not in columns:
+            columns[i] = np.array(values[:, i])
+        return columns[i]
+
+    return [(i, j, _pair_value(method, column(i), column(j), min_periods, i == j)) for i, j in pairs]
+
+
+def _blocks(pairs, block_size):
+    '''
+    Group (i, j) pairs by (i // block_size, j // block_size) so each task touches few columns
+    '''
+    blocks = {}
+    for i, j in pairs:
+        blocks.setdefault((i // block_size, j // block_size), []).append((i, j))
+
+    return list(blocks.values())
+
+
+def _pairwise(values, method, pairs, min_periods, n_jobs, block_size):
+    '''
+    Compute the given column pairs, in parallel when the work is large enough
+    '''
+    result = []
+    if not pairs:
+        return result
+
+    workers = n_jobs or os.cpu_count() or 1
+    if workers == 1 or len(pairs) * values.shape[0] < PARALLEL_MIN_WORK:
+        for i, j in pairs:
+            result.append((i, j, _pair_value(method, values[:, i], values[:, j], min_periods, i == j)))
+        return result
+
+    workdir = tempfile.mkdtemp(prefix='corr_')
+    try:
+        path = os.path.join(workdir, 'values.npy')
+        # column-major on disk so each worker reads its columns contiguously
+        np.save(path, np.asfortranarray(values))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_pair_block, path, method, block, min_periods) for block in _blocks(pairs, block_size)]
+            for future in futures:
+                result.extend(future.result())
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return result
+
+
+@instrumented
+def correlation_matrix(df, method='pearson', min_periods=1, n_jobs=None, block_size=16):
+    '''
+    Same result as df.corr(method=method, min_periods=min_periods), computed for wide/long frames.
+
+    n_jobs: worker processes for per-pair work (Kendall, and Spearman pairs with missing values);
+    None uses every CPU, 1 stays in-process
+    '''
+    method = method.lower()
+    if method not in METHODS:
+        raise ValueError("Invalid correlation method. Expected one of: %s" % METHODS)
+
+    values = _as_matrix(df)
+    p = values.shape[1]
+
+    if method == 'pearson':
+        corr = pearson_matrix(values, min_periods)
+
+    elif method == 'spearman':
+        has_nan = np.isnan(values).any(axis=0)
+        ranks = _as_matrix(df.rank(method='average'))
+        corr = pearson_matrix(ranks, min_periods)
+        # ranks of a column with missing values depend on which rows the pair shares
+        pairs = [(i, j) for i in range(p) for j in range(i + 1) if has_nan[i] or has_nan[j]]
+        for i, j, v in _pairwise(values, method, pairs, min_periods, n_jobs, block_size):
+            corr[i, j] = corr[j, i] = v
+
+    else:
+        corr = np.empty((p, p))
+        pairs = [(i, j) for i in range(p) for j in range(i + 1)]
+        for i, j, v in _pairwise(values, method, pairs, min_periods, n_jobs, block_size):
+            corr[i, j] = corr[j, i] = v
+
+    return pd.DataFrame(corr, index=df.columns, columns=df.columns)
+
+
+@instrumented
+def pair_correlations(df, pairs, method='pearson', min_periods=1, n_jobs=None, block_size=16):
+    '''
+    Correlation of selected (column i, column j) position pairs only, as {(i, j): value}
+    '''
+    method = method.lower()
+    if method not in METHODS:
+        raise ValueError("Invalid correlation method. Expected one of: %s" % METHODS)
+
+    pairs = list(pairs)
+    if method == 'pearson':
+        # one matrix product over the columns involved beats a Python loop over pairs
+        involved = sorted({c for pair in pairs for c in pair})
+        position = {c: k for k, c in enumerate(involved)}
+        corr = pearson_matrix(_as_matrix(df.iloc[:, involved]), min_periods)
+        return {(i, j): corr[position[i], position[j]] for i, j in pairs}
+
+    values = _as_matrix(df)
+    return {(i, j): v for i, j, v in _pairwise(values, method, pairs, min_periods, n_jobs, block_size)}
+
+
+# Fisher z standard errors: Fieller et al. (1957) for Spearman and Kendall
+_Z_VARIANCE = {'spearman': (1.06, 3), 'kendall': (0.437, 4)}
+
+
+def pearson_standard_errors(values, corr, n):
+    '''
+    Asymptotic standard error of each sample Pearson correlation that does not assume normal data.
+
+    Uses the variance of the influence function, E[(zx zy - r/2 (zx^2 + zy^2))^2] / n, from the fourth-order
+    moments of the standardized columns; heavy-tailed vendor attributes make the usual 1 / sqrt(n - 3) far too optimistic.
+    '''
+    mask = ~np.isnan(values)
+    counts = np.maximum(mask.sum(axis=0), 1)
+    means = np.where(mask, values, 0.0).sum(axis=0) / counts
+    centered = np.where(mask, values - means, 0.0)
+    std = np.sqrt((centered * centered).sum(axis=0) / counts)
+    z = centered / np.where(std > 0, std, 1.0)
+    m = mask.astype('float64')
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z2 = z * z
+        m22 = (z2.T @ z2) / n
+        m31 = ((z2 * z).T @ z) / n
+        m40 = ((z2 * z2).T @ m) / n
+        variance = m22 - corr * (m31 + m31.T) + corr * corr / 4 * (m40 + m40.T + 2 * m22)
+
+        return np.sqrt(np.maximum(variance, 0) / n)
+
+
+def correlation_intervals(corr, n, method='pearson', confidence=0.95, values=None):
+    '''
+    Confidence interval (lower, upper) for each sample correlation in `corr` given pairwise counts `n`.
+    For Pearson, `values` (the sample the correlations came from) is required.
+    '''
+    z_crit = norm.ppf(1 - (1 - confidence) / 2)
+    method = method.lower()
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if method == 'pearson':
+            se = pearson_standard_errors(values, corr, n)
+            lower = np.clip(corr - z_crit * se, -1.0, 1.0)
+            upper = np.clip(corr + z_crit * se, -1.0, 1.0)
+            offset = 3
+        else:
+            scale, offset = _Z_VARIANCE[method]
+            z = np.arctanh(np.clip(corr, -1 + 1e-12, 1 - 1e-12))
+            se = np.sqrt(scale / (n - offset))
+            lower = np.tanh(z - z_crit * se)
+            upper = np.tanh(z + z_crit * se)
+
+    # too few rows for an interval: anything is possible
+    unknown = np.isnan(corr) | np.isnan(lower) | np.isnan(upper) | ~(n > offset)
+    lower[unknown] = -1.0
+    upper[unknown] = 1.0
+
+    return lower, upper
+
+
+class CorrelationAccumulator():
+    '''
+    Mergeable Pearson statistics for data that arrives in chunks.
+
+    For every column pair (i, j) it keeps, over the rows where both are present: the count, the mean of
+    column i, its sum of squared deviations and the co-moment of i and j. A chunk is added in
+    O(chunk x p^2) with matrix products, and partial results from separate chunks or workers combine with
+    the pairwise update of Chan et al., so the correlation never needs the raw rows again.
+    '''
+
+    def __init__(self, columns):
+        self.columns = pd.Index(columns)
+        p = len(self.columns)
+        self.n = np.zeros((p, p))
+        self.mean = np.zeros((p, p))
+        self.m2 = np.zeros((p, p))
+        self.cxy = np.zeros((p, p))
+
+
+    @classmethod
+    def from_frame(cls, df):
+        acc = cls(df.columns)
+        acc.update(df)
+        return acc
+
+
+    @property
+    def rows(self):
+        '''
+        Rows seen so far (largest pairwise count)
+        '''
+        return int(self.n.max()) if self.n.size else 0
+
+
+    def _chunk_stats(self, df):
+        values = _as_matrix(df.reindex(columns=self.columns))
+        mask = ~np.isnan(values)
+        counts = mask.sum(axis=0)
+        means = np.where(mask, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+        x = np.where(mask, values - means, 0.0)
+        m = mask.astype('float64')
+
+        n = m.T @ m
+        sx = x.T @ m
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shift = np.where(n > 0, sx / n, 0.0)
+        mean = means[:, None] + shift
+        m2 = (x * x).T @ m - shift * sx
+        cxy = x.T @ x - shift * sx.T
+
+        return n, mean, m2, cxy
+
+
+    def _combine(self, n_b, mean_b, m2_b, cxy_b):
+        n = self.n + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, self.n * n_b / n, 0.0)
+            delta = mean_b - self.mean
+            self.mean = self.mean + np.where(n > 0, delta * n_b / n, 0.0)
+        self.m2 = self.m2 + m2_b + delta * delta * weight
+        self.cxy = self.cxy + cxy_b + delta * delta.T * weight
+        self.n = n
+
+
+    def update(self, df):
+        '''
+        Add a chunk of rows (a DataFrame with these columns)
+        '''
+        self._combine(*self._chunk_stats(df))
+        return self
+
+
+    def merge(self, other):
+        '''
+        Fold in statistics accumulated elsewhere over the same columns
+        '''
+        if not self.columns.equals(other.columns):
+            raise ValueError("Cannot merge accumulators over different columns")
+        self._combine(other.n, other.mean, other.m2, other.cxy)
+        return self
+
+
+    def correlation(self, min_periods=1):
+        '''
+        Pairwise-complete Pearson correlation, same as DataFrame.corr over all rows added so far
+        '''
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.cxy / np.sqrt(self.m2 * self.m2.T)
+
+        tiny = np.finfo('float64').eps * 64
+        scale = self.n * self.mean * self.mean + self.m2
+        degenerate = (self.m2 <= tiny * scale) | (self.m2.T <= tiny * scale.T) | (self.n < max(min_periods, 1))
+        corr[degenerate] = np.nan
+
+        return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=self.columns, columns=self.columns)
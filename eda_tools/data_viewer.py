@@ -0,0 +1,127 @@
+import operator
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+## Server-side paged view of a large frame for Streamlit.
+##
+## st.dataframe(df) serializes every row to the browser on every rerun. FrameView keeps the frame on
+## the server and hands out one page at a time: sorting goes through a per-column sort index computed
+## once, filtering through cached row masks, and a page is an iloc over a slice of the resulting
+## row order, so only the rows on screen are ever copied or sent.
+
+
+_OPERATORS = {'<=': operator.le, '>=': operator.ge, '!=': operator.ne, '==': operator.eq, '<': operator.lt, '>': operator.gt}
+_FILTER = re.compile(r'^\s*(<=|>=|!=|==|<|>)?\s*(.+?)\s*$')
+
+
+class FrameView():
+    '''
+    Sorted / filtered row order over a frame, with pages served by position
+    '''
+
+    def __init__(self, df, max_masks = 8, max_sorts = 4):
+        self.df = df
+        self.max_masks = max_masks
+        self.max_sorts = max_sorts
+        self._sort_index = {}
+        self._masks = {}
+
+
+    def sort_index(self, column, ascending = True):
+        '''
+        Row positions of the frame ordered by `column` (stable, missing values last), computed once per column and direction.
+        Each index is an n-row int64 array, so only the most recently used max_sorts are kept.
+        '''
+        key = (column, ascending)
+        if key in self._sort_index:
+            self._sort_index[key] = self._sort_index.pop(key)
+        else:
+            values = self.df[column].reset_index(drop=True)
+            try:
+                ordered = values.sort_values(ascending=ascending, kind='stable', na_position='last')
+            except TypeError:
+                # mixed types in an object column: order by their text
+                ordered = values.astype(str).where(values.notna()).sort_values(ascending=ascending, kind='stable', na_position='last')
+            if len(self._sort_index) >= self.max_sorts:
+                self._sort_index.pop(next(iter(self._sort_index)))
+            self._sort_index[key] = ordered.index.to_numpy()
+
+        return self._sort_index[key]
+
+
+    def filter_mask(self, column, query):
+        '''
+        Rows matching `query` on `column`. Numeric columns take a comparison ('> 30', '<= 5', '!= -99999'; a bare
+        value means '=='), other columns a case-insensitive substring
+        '''
+        key = (column, query)
+        if key not in self._masks:
+            values = self.df[column]
+            if pd.api.types.is_numeric_dtype(values.dtype):
+                op, value = _FILTER.match(query).groups()
+                mask = _OPERATORS[op or '=='](values, float(value))
+            else:
+                mask = values.astype(str).str.contains(query, case=False, regex=False) & values.notna()
+
+            if len(self._masks) >= self.max_masks:
+                self._masks.pop(next(iter(self._masks)))
+            self._masks[key] = mask.to_numpy()
+
+        return self._masks[key]
+
+
+    def order(self, sort_by = None, ascending = True, filters = None):
+        '''
+        Row positions after filtering ({column: query}) and sorting
+        '''
+        order = self.sort_index(sort_by, ascending) if sort_by is not None else np.arange(len(self.df))
+
+        if filters:
+            keep = np.ones(len(self.df), dtype=bool)
+            for column, query in filters.items():
+                keep &= self.filter_mask(column, query)
+            order = order[keep[order]]
+
+        return order
+
+
+    def page(self, order, page = 0, page_size = 100):
+        '''
+        Rows of one page of `order`, 0-based
+        '''
+        positions = order[page * page_size:(page + 1) * page_size]
+
+        return self.df.iloc[positions]
+
+
+def render_data_viewer(view, key = 'data_viewer', page_sizes = (50, 100, 500), height = 400):
+    '''
+    Streamlit widget showing one page of a FrameView at a time, with sort, filter and page controls
+    '''
+    columns = list(view.df.columns)
+    c1, c2, c3, c4 = st.columns([3, 1, 3, 3])
+    sort_by = c1.selectbox('Sort by', [None] + columns, key=f'{key}_sort', format_func=lambda c: '(file order)' if c is None else str(c))
+    ascending = c2.radio('Order', ['Asc', 'Desc'], key=f'{key}_ascending') == 'Asc'
+    filter_column = c3.selectbox('Filter column', [None] + columns, key=f'{key}_filter_column', format_func=lambda c: '(none)' if c is None else str(c))
+    query = c4.text_input('Filter', key=f'{key}_filter', help="Numeric columns: '> 30', '<= 5', '!= -99999' or a value; text columns: substring")
+
+    filters = {}
+    if filter_column is not None and query.strip():
+        filters[filter_column] = query
+    try:
+        order = view.order(sort_by, ascending, filters)
+    except (ValueError, AttributeError):
+        st.warning(f"Can't filter {filter_column} by '{query}'")
+        order = view.order(sort_by, ascending)
+
+    p1, p2 = st.columns([1, 3])
+    page_size = p1.selectbox('Rows per page', list(page_sizes), key=f'{key}_page_size')
+    pages = max(1, -(-len(order) // page_size))
+    # a new filter or page size starts again from page 1
+    page = p2.number_input(f'Page (of {pages})', min_value=1, max_value=pages, value=1, step=1, key=f'{key}_page_{len(order)}_{page_size}') - 1
+
+    st.dataframe(view.page(order, page, page_size), height=height)
+    st.caption(f'Rows {page * page_size + 1 if len(order) else 0:,}-{min((page + 1) * page_size, len(order)):,} of {len(order):,} ({len(view.df):,} in file)')
@@ -0,0 +1,238 @@
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from eda_tools.text_normalize import duplicate_keys
+from eda_tools.instrumentation import instrument_methods
+
+## Persistent duplicate index across vendor batches.
+## Each key kind (address, phone, SSN, name) is stored as sorted segments of 64-bit hashes of the
+## normalized key. Appending a batch writes one new segment; lookups binary-search every segment,
+## so both cost time in the size of the batch rather than the history. Segments are merged by size
+## tier: once `merge_factor` segments of about the same size exist they become one segment of the
+## next tier, so every hash is rewritten O(log history) times and the segment count stays logarithmic.
+## Segment files are created exclusively (hard link of a finished temp file), so concurrent appends
+## never overwrite each other, and merges of a key are serialized by a lock file.
+
+
+KEYS = ['Address', 'Phone', 'SSN', 'Name']
+
+SENTINELS = [-99999, -99998]
+
+
+def hash_keys(values):
+    '''
+    64-bit hashes of a Series of keys
+    '''
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+@instrument_methods
+class DuplicateIndex():
+
+    def __init__(self, path, merge_factor=4, lock_timeout=3600):
+        '''
+        Open (or create) an index stored in directory `path`
+        '''
+        self.path = path
+        self.merge_factor = merge_factor
+        self.lock_timeout = lock_timeout
+        os.makedirs(self.path, exist_ok=True)
+
+
+    def segments(self, key):
+        return sorted(glob.glob(os.path.join(self.path, f'{key}-*.npy')))
+
+
+    def contains(self, key, hashes):
+        '''
+        Boolean mask of which hashes were already added under `key`
+        '''
+        found = np.zeros(len(hashes), dtype=bool)
+
+        for segment in self.segments(key):
+            stored = np.load(segment, mmap_mode='r')
+            if len(stored) == 0:
+                continue
+            pos = np.searchsorted(stored, hashes)
+            found |= stored[np.minimum(pos, len(stored) - 1)] == hashes
+
+        return found
+
+
+    def add(self, key, hashes):
+        '''
+        Store the distinct hashes as a new sorted segment under `key`
+        '''
+        hashes = np.unique(hashes)
+        if len(hashes) == 0:
+            return
+
+        self._write_segment(key, hashes)
+        self._merge_tiers(key)
+
+
+    def compact(self, key):
+        '''
+        Merge all segments of `key` into one
+        '''
+        with self._merge_lock(key) as locked:
+            segments = self.segments(key)
+            if locked and len(segments) > 1:
+                self._merge(key, segments)
+
+
+    def _tier(self, segment):
+        # segments within a factor of merge_factor in size share a tier
+        entries = max((os.path.getsize(segment) - 128) // 8, 1)
+        return int(np.log(entries) / np.log(self.merge_factor))
+
+
+    def _merge_tiers(self, key):
+        '''
+        Merge the segments of any tier that has reached merge_factor segments, smallest tier first
+        '''
+        with self._merge_lock(key) as locked:
+            while locked:
+                tiers = {}
+                for segment in self.segments(key):
+                    tiers.setdefault(self._tier(segment), []).append(segment)
+                full = [tier for tier, segments in tiers.items() if len(segments) >= self.merge_factor]
+                if not full:
+                    break
+                self._merge(key, tiers[min(full)])
+
+
+    def _merge(self, key, segments):
+        merged = np.unique(np.concatenate([np.load(s) for s in segments]))
+        # the merged segment exists before its inputs go, so lookups never miss a hash
+        self._write_segment(key, merged)
+        for segment in segments:
+            os.remove(segment)
+
+
+    def _merge_lock(self, key):
+        return _TryLock(os.path.join(self.path, f'{key}.merge.lock'), self.lock_timeout)
+
+
+    def batches(self):
+        '''
+        Batches appended so far, oldest first
+        '''
+        log = os.path.join(self.path, 'batches.jsonl')
+        if not os.path.exists(log):
+            return pd.DataFrame(columns=['batch', 'rows', 'added_at'])
+
+        with open(log) as f:
+            return pd.DataFrame([json.loads(line) for line in f])
+
+
+    def flag_batch(self, pii):
+        '''
+        Flag duplicates in a batch (a PII_EDA.get_PII_data() frame) against the batch itself and every earlier batch.
+        Returns the same Duplicated * columns as PII_EDA.identify_duplicates(normalize=True); with an empty
+        index the flags are identical to it.
+        '''
+        return self._flags(pii, self._hashes(pii))
+
+
+    def append(self, pii, batch=None):
+        '''
+        Flag a new batch against the history, then add its keys to the index
+        '''
+        hashes = self._hashes(pii)
+        flags = self._flags(pii, hashes)
+
+        for k in KEYS:
+            h = hashes[k]
+            if k != 'Name':
+                # sentinel rows are never flagged, so they are not worth storing
+                h = h[~pii[k].isin(SENTINELS).to_numpy()]
+            self.add(k, h)
+
+        with open(os.path.join(self.path, 'batches.jsonl'), 'a') as f:
+            f.write(json.dumps({'batch': batch, 'rows': len(pii), 'added_at': time.strftime('%Y-%m-%dT%H:%M:%S')}) + '\n')
+
+        return flags
+
+
+    def _hashes(self, pii):
+        return {k: hash_keys(v) for k, v in zip(KEYS, duplicate_keys(pii, normalize=True))}
+
+
+    def _flags(self, pii, hashes):
+        seen = {}
+        for k in KEYS:
+            # within-batch repeats follow pandas' duplicated(): every occurrence after the first
+            seen[k] = pd.Series(hashes[k]).duplicated().to_numpy() | self.contains(k, hashes[k])
+
+        flags = pd.DataFrame(index=pii.index)
+        for k in ['Address', 'Phone', 'SSN']:
+            flags[f'Duplicated {k}'] = ~pii[k].isin(SENTINELS).to_numpy() & seen[k]
+        for k in ['Address', 'Phone', 'SSN']:
+            flags[f'Duplicated {k} + Name'] = flags[f'Duplicated {k}'].to_numpy() & seen['Name']
+
+        return flags
+
+
+    def _write_segment(self, key, array):
+        '''
+        Write a new segment under the next free sequence number. The name is claimed by hard-linking the
+        finished temp file, which fails if another process took that number first.
+        '''
+        tmp = os.path.join(self.path, f'{key}.{os.getpid()}.{time.time_ns()}.tmp')
+        with open(tmp, 'wb') as f:
+            np.save(f, array)
+
+        try:
+            existing = self.segments(key)
+            seq = int(existing[-1].rsplit('-', 1)[1][:-4]) + 1 if existing else 0
+            while True:
+                try:
+                    os.link(tmp, os.path.join(self.path, f'{key}-{seq:06d}.npy'))
+                    return
+                except FileExistsError:
+                    seq += 1
+        finally:
+            os.remove(tmp)
+
+
+class _TryLock():
+    '''
+    Non-blocking cross-process lock on exclusive creation of a lock file; `as` gives whether it was acquired.
+    Locks older than `timeout` seconds are left by a crashed process and are taken over.
+    '''
+
+    def __init__(self, path, timeout):
+        self.path = path
+        self.timeout = timeout
+        self.locked = False
+
+
+    def __enter__(self):
+        for _ in range(2):
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                self.locked = True
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) <= self.timeout:
+                        break
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+
+        return self.locked
+
+
+    def __exit__(self, *exc):
+        if self.locked:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
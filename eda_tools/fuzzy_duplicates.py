@@ -0,0 +1,202 @@
+import difflib
+import re
+
+import numpy as np
+import pandas as pd
+
+from eda_tools.text_normalize import normalize_text
+from eda_tools.instrumentation import instrumented
+
+try:
+    from rapidfuzz import fuzz
+except ImportError:
+    fuzz = None
+
+try:
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:
+    connected_components = None
+
+## Fuzzy duplicate detection for names and addresses.
+##
+## Comparing every record with every other is O(n^2). Instead records are grouped by a blocking
+## key (phonetic codes of the name, house number + street code for addresses, optionally a
+## state/zip prefix) and sorted within each block; only records at most `window` apart in that
+## order become candidate pairs, so the number of comparisons is at most n * window. Candidates
+## are scored with a string similarity and linked into clusters.
+
+
+STREET_ABBREVIATIONS = {
+    'STREET': 'ST', 'AVENUE': 'AVE', 'ROAD': 'RD', 'DRIVE': 'DR', 'BOULEVARD': 'BLVD',
+    'LANE': 'LN', 'COURT': 'CT', 'PLACE': 'PL', 'TERRACE': 'TER', 'CIRCLE': 'CIR',
+    'HIGHWAY': 'HWY', 'PARKWAY': 'PKWY', 'SQUARE': 'SQ', 'APARTMENT': 'APT', 'SUITE': 'STE',
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+}
+
+_SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(['AEIOUYHW', 'BFPV', 'CGJKQSXZ', 'DT', 'L', 'MN', 'R']) for c in letters}
+
+
+def _soundex_word(word):
+    word = re.sub(r'[^A-Z]', '', word.upper())
+    if not word:
+        return ''
+
+    code = word[0]
+    last = _SOUNDEX_CODES[word[0]]
+    for c in word[1:]:
+        digit = _SOUNDEX_CODES[c]
+        if digit != '0' and digit != last:
+            code += digit
+        # H and W do not separate letters with the same code
+        if c not in 'HW':
+            last = digit
+
+    return (code + '000')[:4]
+
+
+def soundex(s):
+    '''
+    American Soundex code of each value, computed once per distinct value
+    '''
+    codes, uniques = pd.factorize(normalize_text(s, case='upper', strip=True))
+    coded = np.array([_soundex_word(u) for u in uniques], dtype=object)
+
+    return pd.Series(coded[codes], index=s.index, name=s.name)
+
+
+def normalize_address(s):
+    '''
+    Upper-case, strip punctuation and abbreviate street suffixes / directions ('123 Main Street' -> '123 MAIN ST')
+    '''
+    text = normalize_text(s, case='upper', strip=True).str.replace(r'[^\w\s]', ' ', regex=True)
+    pattern = r'\b(' + '|'.join(STREET_ABBREVIATIONS) + r')\b'
+    text = text.str.replace(pattern, lambda m: STREET_ABBREVIATIONS[m.group(1)], regex=True)
+
+    return text.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def similarity(a, b):
+    '''
+    Pairwise string similarity in [0, 1] of two equal-length sequences of strings
+    '''
+    if fuzz is not None:
+        return np.array([fuzz.ratio(x, y) / 100 for x, y in zip(a, b)])
+
+    return np.array([difflib.SequenceMatcher(None, x, y).ratio() for x, y in zip(a, b)])
+
+
+def candidate_pairs(block, order_key, window=10):
+    '''
+    Positions (i, j) of records sharing a block and at most `window` apart when sorted by (block, order_key).
+    Empty block keys never pair.
+    '''
+    # sort on integer codes rather than the strings themselves
+    block_codes, blocks = pd.factorize(pd.Series(block), sort=True)
+    key_codes, _ = pd.factorize(pd.Series(order_key), sort=True)
+    order = np.lexsort((key_codes, block_codes))
+    sorted_block = block_codes[order]
+    empty = blocks.get_loc('') if '' in blocks else -2
+
+    left, right = [], []
+    for k in range(1, window + 1):
+        same = (sorted_block[:-k] == sorted_block[k:]) & (sorted_block[:-k] != empty)
+        left.append(order[:-k][same])
+        right.append(order[k:][same])
+
+    if not left:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    return np.concatenate(left), np.concatenate(right)
+
+
+def _clusters(n, left, right):
+    '''
+    Connected components over linked pairs; returns a cluster id per record
+    '''
+    if connected_components is not None:
+        graph = coo_matrix((np.ones(len(left), dtype=bool), (left, right)), shape=(n, n))
+        return connected_components(graph, directed=False)[1]
+
+    # union-find fallback without scipy
+    parent = np.arange(n)
+
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for a, b in zip(left, right):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    return np.array([find(x) for x in range(n)])
+
+
+@instrumented
+def fuzzy_match(values, block, threshold=0.85, window=10):
+    '''
+    Link records whose normalized `values` score at least `threshold` within a blocking window.
+    Returns (pairs, cluster): the scored candidate pairs at or above the threshold, and a cluster id per record.
+    '''
+    values = pd.Series(values).reset_index(drop=True)
+    left, right = candidate_pairs(block, values, window)
+
+    # one object array of the strings, shared by both sides of the pairs
+    texts = values.astype(str).to_numpy(dtype=object)
+    a = texts[left]
+    b = texts[right]
+    score = np.ones(len(left))
+    # identical strings need no scoring, and each distinct pair of strings is scored once
+    differ = a != b
+    # the similarity ratio can't exceed 2 * min(len) / (len a + len b); skip pairs that can't reach the threshold
+    la = pd.Series(a, dtype=object).str.len().to_numpy()
+    lb = pd.Series(b, dtype=object).str.len().to_numpy()
+    reachable = 2 * np.minimum(la, lb) >= threshold * (la + lb)
+    score[differ & ~reachable] = 0
+    differ &= reachable
+    if differ.any():
+        codes, uniques = pd.factorize(pd.MultiIndex.from_arrays([a[differ], b[differ]]))
+        score[differ] = similarity(uniques.get_level_values(0), uniques.get_level_values(1))[codes]
+
+    keep = score >= threshold
+    pairs = pd.DataFrame({'Record 1': left[keep], 'Record 2': right[keep], 'Score': score[keep]})
+    cluster = _clusters(len(values), pairs['Record 1'].to_numpy(), pairs['Record 2'].to_numpy())
+
+    return pairs, cluster
+
+
+@instrumented
+def fuzzy_duplicates(first, last, address, geo=None, threshold=0.85, window=10):
+    '''
+    Fuzzy duplicate flags for names and addresses.
+
+    Names are blocked on the Soundex codes of first and last name, addresses on house number plus the
+    Soundex code of the first street word; `geo` (state or zip prefix) is added to both keys if given.
+    Returns one row per record with the cluster ids and 'Fuzzy Duplicated Name' / 'Fuzzy Duplicated Address'
+    flags, which, like pandas' duplicated(), mark every member of a cluster except the first.
+    '''
+    index = first.index
+    geo = pd.Series('', index=index) if geo is None else normalize_text(geo, case='upper', strip=True)
+
+    name = normalize_text(first, case='upper', strip=True) + ' ' + normalize_text(last, case='upper', strip=True)
+    name_block = soundex(first) + soundex(last)
+    name_block = name_block + '|' + geo
+    name_block[name.str.strip() == ''] = ''
+
+    addr = normalize_address(address)
+    tokens = addr.str.extract(r'^(\d+)\s+(\S+)')
+    addr_block = tokens[0].fillna('') + ' ' + soundex(tokens[1].fillna('')) + '|' + geo
+    addr_block[tokens[0].isna() | (addr == '')] = ''
+
+    result = pd.DataFrame(index=index)
+    for label, values, block in [('Name', name, name_block), ('Address', addr, addr_block)]:
+        _, cluster = fuzzy_match(values, block, threshold, window)
+        result[f'{label} Cluster'] = cluster
+        result[f'Fuzzy Duplicated {label}'] = pd.Series(cluster).duplicated().to_numpy()
+
+    return result
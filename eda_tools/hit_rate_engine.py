@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from eda_tools.instrumentation import instrumented, instrument_methods
+
+## Hit rates of many vendor files against one performance sample, as a hash semi-join.
+##
+## The performance keys are hashed once into a sorted array of distinct hashes. Each vendor file's key
+## column is then streamed through it in chunks: a binary search marks which performance keys the vendor
+## has, and no payload columns are ever joined. A performance row counts as a hit once, however many
+## vendor rows share its key.
+
+
+def _column_hashes(s):
+    '''
+    64-bit hash of each value of one key column. Whole numbers hash as int64, whatever the column's dtype, so 5 and 5.0
+    match and integer keys above 2**53 stay distinct; only fractional numbers hash as float64
+    '''
+    if not pd.api.types.is_numeric_dtype(s.dtype):
+        return pd.util.hash_pandas_object(s, index=False).to_numpy()
+    if pd.api.types.is_integer_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype):
+        # missing values are masked out by the caller, any placeholder will do
+        return pd.util.hash_array(s.to_numpy(dtype='int64', na_value=0))
+
+    values = s.to_numpy(dtype='float64', na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        whole = (values == np.round(values)) & (np.abs(values) < 2.0 ** 63)
+    hashes = pd.util.hash_array(values)
+    hashes[whole] = pd.util.hash_array(values[whole].astype('int64'))
+
+    return hashes
+
+
+def _key_hashes(keys):
+    '''
+    64-bit hashes of the key column(s) and which rows have every key present
+    '''
+    keys = keys.to_frame() if isinstance(keys, pd.Series) else keys
+    valid = keys.notna().all(axis=1).to_numpy()
+    hashes = pd.DataFrame({i: _column_hashes(keys[c]) for i, c in enumerate(keys.columns)})
+
+    return pd.util.hash_pandas_object(hashes, index=False).to_numpy(), valid
+
+
+def _chunks(data, columns, chunksize):
+    if isinstance(data, str):
+        yield from pd.read_csv(data, usecols=columns, chunksize=chunksize, low_memory=False)
+    else:
+        for start in range(0, len(data), chunksize):
+            yield data[columns].iloc[start:start + chunksize]
+
+
+@instrument_methods
+class PerformanceKeys():
+    '''
+    Hashed key set of a performance sample (dataframe or CSV path), built once and probed by any number of vendors
+    '''
+
+    def __init__(self, perf, key, performance = None):
+        self.key = [key] if isinstance(key, str) else list(key)
+        self.performance = performance
+        columns = self.key + ([performance] if performance is not None else [])
+        data = pd.read_csv(perf, usecols=columns, low_memory=False) if isinstance(perf, str) else perf[columns]
+
+        self.rows = len(data)
+        hashes, valid = _key_hashes(data[self.key])
+        self.hashes, inverse = np.unique(hashes[valid], return_inverse=True)
+        # distinct-key position of every performance row; rows with a missing key never hit
+        self.row_key = np.full(self.rows, -1, dtype='int64')
+        self.row_key[valid] = inverse
+        self.bad = (data[performance] == 1).to_numpy() if performance is not None else None
+
+
+    def matched(self, vendor, key = None, chunksize = 500000):
+        '''
+        Boolean mask over performance rows whose key appears in the vendor data (dataframe or CSV path)
+        '''
+        key = self.key if key is None else ([key] if isinstance(key, str) else list(key))
+        found = np.zeros(len(self.hashes), dtype=bool)
+        if len(self.hashes) == 0:
+            return np.zeros(self.rows, dtype=bool)
+
+        for chunk in _chunks(vendor, key, chunksize):
+            hashes, valid = _key_hashes(chunk[key])
+            hashes = np.unique(hashes[valid])
+            pos = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+            found[pos[self.hashes[pos] == hashes]] = True
+
+        return (self.row_key >= 0) & found[np.maximum(self.row_key, 0)]
+
+
+    def hit_stats(self, vendor, key = None, chunksize = 500000):
+        '''
+        Hit count and rate of one vendor; with a performance flag also the hit rates of bad / good rows
+        and the bad rate of the hit rows
+        '''
+        hits = self.matched(vendor, key, chunksize)
+        stats = {'hits': int(hits.sum()), 'hit_rate': hits.sum() / self.rows}
+
+        if self.bad is not None:
+            stats['bad_hit_rate'] = (hits & self.bad).sum() / self.bad.sum()
+            stats['good_hit_rate'] = (hits & ~self.bad).sum() / (~self.bad).sum()
+            stats['hit_bad_rate'] = (hits & self.bad).sum() / hits.sum() if hits.any() else np.nan
+
+        return stats
+
+
+@instrumented
+def vendor_hit_rates(vendors, perf, vendor_key, perf_key, performance = None, chunksize = 500000):
+    '''
+    Hit rates of several vendors against one performance sample.
+    `vendors` maps a vendor name to its dataframe or CSV path; `vendor_key` is one key for all vendors
+    or a dict of keys by vendor name. Returns one row per vendor.
+    '''
+    keys = PerformanceKeys(perf, perf_key, performance)
+    rows = {}
+    for name, vendor in vendors.items():
+        key = vendor_key[name] if isinstance(vendor_key, dict) else vendor_key
+        rows[name] = keys.hit_stats(vendor, key, chunksize)
+
+    result = pd.DataFrame.from_dict(rows, orient='index')
+    result.index.name = 'vendor'
+
+    return result
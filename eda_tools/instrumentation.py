@@ -0,0 +1,217 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+## Opt-in timing of the eda_tools entry points.
+##
+## Public functions and methods are wrapped with @instrumented (or every public method of a class with
+## @instrument_methods). Outside a `with recording():` block the wrapper only checks a thread-local and
+## calls straight through. Inside one, each call becomes a span with wall time, CPU time, peak traced
+## memory and the rows / columns of the frame it worked on; spans nest, so a method's own time is its
+## wall time minus that of the instrumented calls it made. Recordings are per thread, i.e. per
+## Streamlit session run.
+##
+## Memory tracing is not: tracemalloc is process-wide. Recordings with trace_memory share one tracing
+## session, started by the first and stopped when the last one ends, and while two sessions trace at
+## once each one's peaks include the other's allocations (and its peak resets). Peak memory is only
+## exact for a session that traces alone.
+
+
+class _Local(threading.local):
+    # a class default avoids the cost of a failed attribute lookup on every call
+    recorder = None
+
+
+_local = _Local()
+
+# recordings currently tracing memory, and whether tracing was started by them rather than by the caller
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+class Recorder():
+    '''
+    Spans recorded in one `recording()` block
+    '''
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.spans = []
+        self._stack = []
+        self._origin = time.perf_counter()
+
+
+    def _enter(self, name):
+        span = {
+            'name': name, 'id': len(self.spans), 'parent': self._stack[-1]['id'] if self._stack else None,
+            'depth': len(self._stack), 'start': time.perf_counter() - self._origin, 'cpu_start': time.process_time(),
+            'children_wall': 0.0, 'rows': None, 'columns': None,
+        }
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # keep the parent's peak so far before the counter is reset for this span
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            span['memory_start'] = span['peak'] = current
+
+        self.spans.append(span)
+        self._stack.append(span)
+
+        return span
+
+
+    def _exit(self, span, shape):
+        span['wall'] = time.perf_counter() - self._origin - span['start']
+        span['cpu'] = time.process_time() - span.pop('cpu_start')
+        span['self_wall'] = span['wall'] - span.pop('children_wall')
+        if shape is not None:
+            span['rows'], span['columns'] = shape
+
+        if 'peak' in span:
+            span['peak'] = max(span['peak'], tracemalloc.get_traced_memory()[1])
+            span['peak_mb'] = (span['peak'] - span['memory_start']) / 2 ** 20
+
+        self._stack.pop()
+        if self._stack:
+            parent = self._stack[-1]
+            parent['children_wall'] += span['wall']
+            if 'peak' in span and 'peak' in parent:
+                parent['peak'] = max(parent['peak'], span['peak'])
+
+
+    def records(self):
+        keys = ['id', 'parent', 'depth', 'name', 'start', 'wall', 'self_wall', 'cpu', 'peak_mb', 'rows', 'columns']
+        return [{k: s.get(k) for k in keys} for s in self.spans if 'wall' in s]
+
+
+    def report(self):
+        '''
+        Breakdown per function: calls, total and self wall time, CPU time, largest peak memory and most rows seen
+        '''
+        spans = pd.DataFrame(self.records(), columns=['name', 'wall', 'self_wall', 'cpu', 'peak_mb', 'rows', 'columns'])
+        report = spans.groupby('name', sort=False).agg(
+            calls=('wall', 'size'), wall=('wall', 'sum'), self_wall=('self_wall', 'sum'), cpu=('cpu', 'sum'),
+            peak_mb=('peak_mb', 'max'), rows=('rows', 'max'), columns=('columns', 'max'),
+        )
+
+        return report.sort_values('self_wall', ascending=False)
+
+
+    def to_json(self):
+        return json.dumps({'spans': self.records()}, indent=2)
+
+
+    def to_chrome_trace(self):
+        '''
+        Spans as Chrome trace events (open in chrome://tracing or Perfetto)
+        '''
+        events = [{
+            'name': s['name'], 'ph': 'X', 'ts': s['start'] * 1e6, 'dur': s['wall'] * 1e6, 'pid': os.getpid(), 'tid': 0,
+            'args': {k: s[k] for k in ['cpu', 'peak_mb', 'rows', 'columns'] if s[k] is not None},
+        } for s in self.records()]
+
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'})
+
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_json())
+
+
+    def export_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_chrome_trace())
+
+
+@contextmanager
+def recording(trace_memory=True):
+    '''
+    Record every instrumented call made by this thread inside the block; yields the Recorder
+    '''
+    recorder = Recorder(trace_memory)
+    previous = _local.recorder
+    if trace_memory:
+        _start_tracing()
+
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+        if trace_memory:
+            _stop_tracing()
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    # only the last recording out stops tracing, and only if the recordings started it
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+def _shape(args, result):
+    # the frame a call works on: the instance's df, else the first frame argument, else the frame it returns
+    for value in args[:1]:
+        df = getattr(value, 'df', None)
+        if isinstance(df, (pd.DataFrame, pd.Series)):
+            return df.shape[0], df.shape[1] if df.ndim > 1 else 1
+    for value in list(args) + [result]:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return value.shape[0], value.shape[1] if value.ndim > 1 else 1
+
+    return None
+
+
+def instrumented(fn):
+    '''
+    Record calls to fn while a recording() is active
+    '''
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        recorder = _local.recorder
+        if recorder is None:
+            return fn(*args, **kwargs)
+
+        span = recorder._enter(name)
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            recorder._exit(span, _shape(args, result))
+
+    return wrapper
+
+
+def instrument_methods(cls):
+    '''
+    Class decorator applying @instrumented to every public plain method
+    '''
+    for name, member in list(vars(cls).items()):
+        if not name.startswith('_') and inspect.isfunction(member):
+            setattr(cls, name, instrumented(member))
+
+    return cls
@@ -0,0 +1,240 @@
+import hashlib
+import multiprocessing
+import os
+import pickle
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from eda_tools.PII_EDA_tool import PII_EDA
+from eda_tools.profile_tiers import ProfilePlan
+from eda_tools.report_cache import ReportCache
+
+## Local job scheduler for slow reports (profiles, PII report pages) so they run outside the Streamlit
+## script thread. Jobs are identified by a key: submitting a key that is already queued or running
+## attaches to that job, and a finished job's result is pickled to `artifact_dir`, so reruns, browser
+## refreshes and other sessions pick it up instead of starting the work again. Workers report progress
+## through a Manager dict that the UI polls. A failed job stays failed, with its error, until it is
+## retried or discarded. Artifacts are capped at `max_bytes`, least recently used evicted first.
+
+
+def file_job_key(name, path, **options):
+    '''
+    Job key for a report on a file: changes whenever the file is rewritten
+    '''
+    st = os.stat(path)
+    h = hashlib.sha256(f'{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}'.encode())
+    for option in sorted(options):
+        h.update(f'{option}={options[option]!r}'.encode())
+
+    return f'{name}-{h.hexdigest()}'
+
+
+class JobRunner():
+    '''
+    Process pool running keyed report jobs, one at a time per key
+    '''
+
+    def __init__(self, max_workers=None, artifact_dir='.report_jobs', max_bytes=512 * 1024 * 1024):
+        self.artifact_dir = artifact_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        self._pool = ProcessPoolExecutor(max_workers)
+        self._manager = multiprocessing.Manager()
+        self._progress = self._manager.dict()
+        self._jobs = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+
+
+    def artifact_path(self, key):
+        return os.path.join(self.artifact_dir, f'{key}.pkl')
+
+
+    def submit(self, key, fn, *args, **kwargs):
+        '''
+        Run fn(*args, progress=callback, **kwargs) in the pool unless `key` is already finished, in flight or failed.
+        `fn` must be a module-level function; it may call progress(fraction, message) as it goes.
+        '''
+        with self._lock:
+            if os.path.exists(self.artifact_path(key)):
+                return key
+            future = self._jobs.get(key)
+            # a finished job whose artifact was evicted runs again; a failed one waits for retry()
+            if future is not None and not (future.done() and future.exception() is None):
+                return key
+
+            self._start(key, fn, args, kwargs)
+
+        return key
+
+
+    def retry(self, key):
+        '''
+        Run a failed job again with the arguments it was submitted with
+        '''
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is None or not future.done() or future.exception() is None:
+                return key
+
+            fn, args, kwargs = self._calls[key]
+            self._start(key, fn, args, kwargs)
+
+        return key
+
+
+    def _start(self, key, fn, args, kwargs):
+        self._progress[key] = (0.0, 'queued')
+        self._calls[key] = (fn, args, kwargs)
+        self._jobs[key] = self._pool.submit(_run_job, fn, key, self._progress, self.artifact_path(key), args, kwargs)
+        self._jobs[key].add_done_callback(lambda future: self.evict())
+
+
+    def status(self, key):
+        '''
+        State of a job ('missing', 'queued', 'running', 'done' or 'failed') with its progress fraction and message
+        '''
+        if os.path.exists(self.artifact_path(key)):
+            return {'state': 'done', 'progress': 1.0, 'message': 'done'}
+
+        future = self._jobs.get(key)
+        if future is not None and future.done() and future.exception() is not None:
+            return {'state': 'failed', 'progress': 1.0, 'message': str(future.exception())}
+        if future is None or future.done():
+            # never submitted, or finished and its artifact since evicted
+            return {'state': 'missing', 'progress': 0.0, 'message': ''}
+
+        fraction, message = self._progress.get(key, (0.0, 'queued'))
+        return {'state': 'running' if future.running() else 'queued', 'progress': fraction, 'message': message}
+
+
+    def active(self):
+        '''
+        Keys of the jobs still queued or running
+        '''
+        return [key for key, future in list(self._jobs.items()) if not future.done()]
+
+
+    def result(self, key):
+        '''
+        The finished job's result, or None if it isn't finished. Reading it refreshes its LRU position
+        '''
+        path = self.artifact_path(key)
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return result
+
+
+    def discard(self, key):
+        '''
+        Forget a finished or failed job so the next submit runs it again
+        '''
+        with self._lock:
+            self._jobs.pop(key, None)
+            self._calls.pop(key, None)
+            try:
+                os.remove(self.artifact_path(key))
+            except FileNotFoundError:
+                pass
+
+
+    def evict(self):
+        '''
+        Remove least recently used artifacts until they fit in max_bytes
+        '''
+        entries = []
+        for name in os.listdir(self.artifact_dir):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.artifact_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+
+        entries.sort(key=lambda e: e[2])
+        total = sum(e[1] for e in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+
+
+def _run_job(fn, key, progress_dict, artifact_path, args, kwargs):
+    def progress(fraction, message=''):
+        progress_dict[key] = (float(fraction), message)
+
+    progress(0.0, 'running')
+    try:
+        result = fn(*args, progress=progress, **kwargs)
+    except Exception:
+        progress(1.0, 'failed')
+        raise RuntimeError(traceback.format_exc())
+
+    tmp = f'{artifact_path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(result, f)
+    os.replace(tmp, artifact_path)
+    progress(1.0, 'done')
+
+
+def profile_report_job(path, tier=None, cache_dir='.report_cache', progress=None):
+    '''
+    Profile report of a CSV at the given tier, stored in (or served from) the ReportCache; returns its html
+    '''
+    progress(0.05, 'loading data')
+    df = pd.read_csv(path, index_col=0)
+    plan = ProfilePlan(df, tier=tier)
+    cache = ReportCache(cache_dir)
+
+    progress(0.2, f'building the {plan.tier} profile')
+    html = cache.get_or_create(plan.cache_key(cache, df), plan.build)
+    progress(1.0, 'done')
+
+    return html
+
+
+PII_REPORT_SECTIONS = [
+    ('Hit Rates', 'get_hit_rates'),
+    ('Top States', 'top_states'),
+    ('Age Distribution', 'get_age_distribution'),
+    ('SSN ITIN Flag', 'ssn_is_itin_flag'),
+    ('Invalid SSN Flag', 'invalid_ssn_flag'),
+    ('Duplicated PII', 'duplicate_PII'),
+]
+
+
+def pii_report_job(path, columns=None, progress=None):
+    '''
+    The PII_EDA summary tables of a CSV, by section title
+    '''
+    progress(0.05, 'loading data')
+    pii = PII_EDA(path, columns=columns)
+
+    tables = {}
+    for i, (title, method) in enumerate(PII_REPORT_SECTIONS):
+        progress(0.1 + 0.9 * i / len(PII_REPORT_SECTIONS), title)
+        tables[title] = getattr(pii, method)()
+
+    return tables
@@ -1,65 +1,241 @@
-import missingno
+import os
+
+import matplotlib.pyplot as plt
+from matplotlib.colors import LinearSegmentedColormap
 import pandas as pd
 import numpy as np
+import seaborn as sns
+
+from eda_tools.nullity import NullityMatrix
+from eda_tools.instrumentation import instrumented
 
 ## Specify exception values by user
 
 
+class ColumnStats():
+    '''
+    Per-column null counts, exception-value counts and row count, gathered chunk by chunk in a single pass.
+    The missing-value helpers below accept a ColumnStats in place of a dataframe.
+    '''
+
+    def __init__(self, columns, exception_values = None):
+        self.columns = pd.Index(columns)
+        self.exception_values = list(exception_values or [])
+        # a column parsed as text in some chunks holds the values as strings ('-99999'); match both forms
+        self._exception_forms = self.exception_values + [str(v) for v in self.exception_values if not isinstance(v, str)]
+        self.rows = 0
+        self.null_count = pd.Series(0, index=self.columns, dtype='int64')
+        self.exception_count = pd.Series(0, index=self.columns, dtype='int64')
+
+
+    def update(self, chunk):
+        '''
+        Add a chunk of rows
+        '''
+        chunk = chunk.reindex(columns=self.columns)
+        self.rows += len(chunk)
+        self.null_count += chunk.isnull().sum()
+        if self.exception_values:
+            self.exception_count += chunk.isin(self._exception_forms).sum()
+
+        return self
+
+
+    def null_rate(self):
+        return self.null_count / self.rows
+
+
+    def exception_rate(self):
+        return self.exception_count / self.rows
+
+
+# most recently used last; bounded so a session scanning many files doesn't keep every result
+_stats_cache = {}
+_STATS_CACHE_SIZE = 32
+
+
+@instrumented
+def column_stats(data, exception_values = None, chunksize = 100000):
+    '''
+    Scan a dataframe or a CSV path once and return its ColumnStats. CSV results are cached per file version.
+    '''
+    if isinstance(data, str):
+        st = os.stat(data)
+        key = (os.path.abspath(data), st.st_size, st.st_mtime_ns, tuple(exception_values or []))
+        if key in _stats_cache:
+            _stats_cache[key] = _stats_cache.pop(key)
+            return _stats_cache[key]
+
+        try:
+            # columns from the header, so a file without rows still gets (empty) stats
+            stats = ColumnStats(pd.read_csv(data, nrows=0).columns, exception_values)
+        except pd.errors.EmptyDataError:
+            return ColumnStats([], exception_values)
+        for chunk in pd.read_csv(data, chunksize=chunksize, low_memory=False):
+            stats.update(chunk)
+
+        if len(_stats_cache) >= _STATS_CACHE_SIZE:
+            _stats_cache.pop(next(iter(_stats_cache)))
+        _stats_cache[key] = stats
+        return stats
+
+    stats = ColumnStats(data.columns, exception_values)
+    # slicing bounds the temporary boolean masks to one chunk
+    for start in range(0, len(data), chunksize):
+        stats.update(data.iloc[start:start + chunksize])
+
+    return stats
+
+
+def _stats_for(df, exception_values = None):
+    if isinstance(df, NullityMatrix) and exception_values is None:
+        return df
+    if isinstance(df, ColumnStats):
+        if exception_values is not None and list(exception_values) != df.exception_values:
+            raise ValueError("ColumnStats were collected for exception values %s, not %s" % (df.exception_values, list(exception_values)))
+        return df
+
+    return column_stats(df, exception_values)
+
+
+@instrumented
 def columns_to_analyze_missing(df, threshold = 0.015):
         '''
         Returns a list of columns to analyze missing values
         '''
-        return df.loc[:, df.isnull().mean() > threshold].columns.tolist()
+        null_rate = _stats_for(df).null_rate()
+        return null_rate[null_rate > threshold].index.tolist()
 
 
 
-def missing_analysis_matrix(df, columns = None, threshold = 0.015, figsize = (10,10), fontsize = 12, color = (0.25, 0.25, 0.25)):
+@instrumented
+def missing_analysis_matrix(df, columns = None, threshold = 0.015, figsize = (10,10), fontsize = 12, color = (0.25, 0.25, 0.25), max_rows = 2000):
     '''
-    Plots the missing values for the columns in the dataframe
+    Plots the missing values for the columns in the dataframe (or NullityMatrix) in the layout of missingno.matrix.
+    Rows are aggregated into at most `max_rows` blocks shaded by their share of present values, so the image
+    has the same size for any number of rows
     '''
-    if columns is None:
-        columns = columns_to_analyze_missing(df, threshold)
-    missingno.matrix(df[columns], figsize = figsize, fontsize = fontsize, color = color)
+    nullity = _nullity_for(df, columns, threshold)
+    present = 1 - nullity.block_rates(max_rows).to_numpy()
+
+    plt.figure(figsize = figsize)
+    ax = plt.gca()
+    ax.imshow(present, cmap = LinearSegmentedColormap.from_list('nullity', [(1, 1, 1), color]), vmin = 0, vmax = 1, aspect = 'auto', interpolation = 'none')
+    ax.vlines(np.arange(0.5, present.shape[1] - 1), -0.5, present.shape[0] - 0.5, color = 'white', linewidth = 1)
+
+    ax.xaxis.tick_top()
+    ax.set_xticks(range(len(nullity.columns)))
+    ax.set_xticklabels(nullity.columns, rotation = 45, ha = 'left', fontsize = fontsize)
+    ax.set_yticks([0, present.shape[0] - 1])
+    ax.set_yticklabels([1, nullity.rows], fontsize = fontsize)
+    ax.tick_params(length = 0)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
 
+    return ax
 
 
 
+@instrumented
 def missing_analysis_bar(df, columns = None, threshold = 0.015, figsize = (10,10), fontsize = 12, color = (0.25, 0.25, 0.25)):
     '''
-    Plots the missing values for the columns in the dataframe
+    Plots the share of present values for the columns in the dataframe (or ColumnStats / NullityMatrix) in the layout of
+    missingno.bar, with the present counts along the top
     '''
+    stats = _stats_for(df)
     if columns is None:
-        columns = columns_to_analyze_missing(df, threshold)
-    missingno.bar(df[columns], figsize = figsize, fontsize = fontsize, color = color)
+        columns = columns_to_analyze_missing(stats, threshold)
+    present = stats.rows - stats.null_count[columns]
+    positions = np.arange(len(columns))
+
+    plt.figure(figsize = figsize)
+    ax = plt.gca()
+    ax.bar(positions, present / max(stats.rows, 1), width = 0.5, color = color)
+    ax.set_xlim(-0.5, len(columns) - 0.5)
+    ax.set_ylim(0, 1)
+    ax.set_xticks(positions)
+    ax.set_xticklabels(columns, rotation = 45, ha = 'right', fontsize = fontsize)
+    ax.tick_params(axis = 'y', labelsize = fontsize)
+
+    counts = ax.twiny()
+    counts.set_xlim(ax.get_xlim())
+    counts.set_xticks(positions)
+    counts.set_xticklabels(present.tolist(), rotation = 45, ha = 'left', fontsize = fontsize)
+    for axis in [ax, counts]:
+        axis.tick_params(length = 0)
+        for spine in axis.spines.values():
+            spine.set_visible(False)
 
+    return ax
 
 
-def missing_analysis_heatmap(df, columns = None, threshold = 0.015, figsize = (10,10), fontsize = 12, color = (0.25, 0.25, 0.25)):
+
+@instrumented
+def missing_analysis_heatmap(df, columns = None, threshold = 0.015, figsize = (10,10), fontsize = 12, color = (0.25, 0.25, 0.25), cmap = 'RdBu'):
     '''
-    Plots the missing values for the columns in the dataframe
+    Plots the nullity correlation for the columns in the dataframe (or NullityMatrix), in the style of missingno.heatmap
     '''
+    corr = _nullity_for(df, columns, threshold).correlation()
+    mask = np.zeros_like(corr, dtype=bool)
+    mask[np.triu_indices_from(mask)] = True
+
+    plt.figure(figsize = figsize)
+    ax = sns.heatmap(corr, mask = mask, cmap = cmap, annot = True, annot_kws = {'size': fontsize - 2}, vmin = -1, vmax = 1)
+    ax.xaxis.tick_bottom()
+    ax.set_xticklabels(ax.xaxis.get_majorticklabels(), rotation = 45, ha = 'right', fontsize = fontsize)
+    ax.set_yticklabels(ax.yaxis.get_majorticklabels(), rotation = 0, fontsize = fontsize)
+    ax.xaxis.set_ticks_position('none')
+    ax.yaxis.set_ticks_position('none')
+    ax.patch.set_visible(False)
+
+    for text in ax.texts:
+        t = float(text.get_text())
+        if 0.95 <= t < 1:
+            text.set_text('<1')
+        elif -1 < t <= -0.95:
+            text.set_text('>-1')
+        elif t == 1:
+            text.set_text('1')
+        elif t == -1:
+            text.set_text('-1')
+        elif -0.05 < t < 0.05:
+            text.set_text('')
+        else:
+            text.set_text(round(t, 1))
+
+    return ax
+
+
+def _nullity_for(df, columns = None, threshold = 0.015):
     if columns is None:
         columns = columns_to_analyze_missing(df, threshold)
-    missingno.heatmap(df[columns], figsize = figsize, fontsize = fontsize, color = color)
+    if isinstance(df, NullityMatrix):
+        return df[columns]
+
+    return NullityMatrix.from_frame(df, columns)
     
     
+@instrumented
 def top_missing_variables(df, count = 50):
     '''
     List top n missing varaibles, and its missing count, missing percentage with two digits and percentage format, in descending order
     '''
-    missing_count = df.isnull().sum().sort_values(ascending = False)
-    missing_percentage = (df.isnull().mean() * 100).sort_values(ascending = False).round(2).astype(str) + '%'
+    stats = _stats_for(df)
+    missing_count = stats.null_count.sort_values(ascending = False)
+    missing_percentage = (stats.null_rate() * 100).sort_values(ascending = False).round(2).astype(str) + '%'
     missing_df = pd.concat([missing_count, missing_percentage], axis = 1, keys = ['missing_count', 'missing_percentage'])
     return missing_df.head(count)   
 
 
+@instrumented
 def top_exception_variables(df, value: list, show_rows=30):
     '''
     Do Exception/Missing analysis with the user provided value, and print the top `show_rows` columns with the most exceptions
     '''
     try:
-        exception_count = df.isin(value).sum().sort_values(ascending=False)
-        exception_percentage = (df.isin(value).mean() * 100).sort_values(ascending=False).round(2).astype(str) + '%'
+        stats = _stats_for(df, value)
+        exception_count = stats.exception_count.sort_values(ascending=False)
+        exception_percentage = (stats.exception_rate() * 100).sort_values(ascending=False).round(2).astype(str) + '%'
         exception_df = pd.concat([exception_count, exception_percentage], axis=1, keys=['exception_count', 'exception_percentage'])
         return exception_df.head(show_rows)
     except Exception as e:
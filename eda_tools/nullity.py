@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+from eda_tools.instrumentation import instrument_methods
+
+## Bit-packed nullity matrix: one bit per cell, packed along the rows of each column, so a column
+## of n rows takes n / 8 bytes (1/64 of a float64 mask). Null counts, pairwise co-missing counts
+## and the nullity correlation are all popcounts over ANDed bit rows, done block by block.
+
+
+# number of set bits in every byte value
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(bits):
+    '''
+    Number of set bits in each byte of a uint8 array
+    '''
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bits)
+    return _POPCOUNT[bits]
+
+
+@instrument_methods
+class NullityMatrix():
+    '''
+    Which cells of a frame are null, packed to one bit per cell. Row r of column c is bit (7 - r % 8) of bits[c, r // 8].
+    '''
+
+    def __init__(self, columns, bits, rows):
+        self.columns = pd.Index(columns)
+        self.bits = bits
+        self.rows = rows
+
+
+    @classmethod
+    def from_chunks(cls, chunks, columns = None):
+        '''
+        Pack a sequence of dataframe chunks; every chunk but the last must have a multiple of 8 rows
+        '''
+        parts = []
+        rows = 0
+        for chunk in chunks:
+            if columns is None:
+                columns = chunk.columns
+            # one transposed chunk-sized boolean mask at a time
+            parts.append(np.packbits(chunk.reindex(columns=columns).isnull().to_numpy().T, axis=1))
+            rows += len(chunk)
+
+        columns = pd.Index([] if columns is None else columns)
+        bits = np.concatenate(parts, axis=1) if parts else np.zeros((len(columns), 0), dtype=np.uint8)
+
+        return cls(columns, bits, rows)
+
+
+    @classmethod
+    def from_frame(cls, df, columns = None, chunksize = 65536):
+        chunksize = max(8, chunksize - chunksize % 8)
+        data = df if columns is None else df[columns]
+        return cls.from_chunks((data.iloc[start:start + chunksize] for start in range(0, len(data), chunksize)), data.columns)
+
+
+    @classmethod
+    def from_csv(cls, path, columns = None, chunksize = 65536, **csv_kwargs):
+        chunksize = max(8, chunksize - chunksize % 8)
+        return cls.from_chunks(pd.read_csv(path, usecols=columns, chunksize=chunksize, low_memory=False, **csv_kwargs), columns)
+
+
+    def __getitem__(self, columns):
+        '''
+        Sub-matrix of the given columns
+        '''
+        positions = self.columns.get_indexer(columns)
+        if (positions < 0).any():
+            raise KeyError([c for c, p in zip(columns, positions) if p < 0])
+
+        return NullityMatrix(self.columns[positions], self.bits[positions], self.rows)
+
+
+    @property
+    def null_count(self):
+        return pd.Series(_popcount(self.bits).sum(axis=1, dtype='int64'), index=self.columns)
+
+
+    def null_rate(self):
+        return self.null_count / self.rows
+
+
+    def co_missing(self, block_bytes = 1 << 16):
+        '''
+        Rows in which both columns are null, for every pair of columns; the diagonal is the null count
+        '''
+        k = len(self.columns)
+        counts = np.zeros((k, k), dtype='int64')
+
+        for start in range(0, self.bits.shape[1], block_bytes):
+            block = self.bits[:, start:start + block_bytes]
+            for i in range(k):
+                counts[i, i:] += _popcount(block[i] & block[i:]).sum(axis=1, dtype='int64')
+
+        counts = np.triu(counts) + np.triu(counts, 1).T
+
+        return pd.DataFrame(counts, index=self.columns, columns=self.columns)
+
+
+    def correlation(self):
+        '''
+        Pearson correlation of the nullity indicators, as missingno.heatmap computes it;
+        columns that are never or always null are left out
+        '''
+        co = self.co_missing().to_numpy().astype('float64')
+        n = self.rows
+        count = np.diag(co)
+        var = count * (n - count)
+        keep = var > 0
+
+        cov = n * co[np.ix_(keep, keep)] - np.outer(count[keep], count[keep])
+        corr = cov / np.sqrt(np.outer(var[keep], var[keep]))
+
+        return pd.DataFrame(corr, index=self.columns[keep], columns=self.columns[keep])
+
+
+    def sample(self, max_rows = 2000):
+        '''
+        Null mask of at most max_rows evenly spaced rows, in row order, for matrix plots
+        '''
+        if self.rows <= max_rows:
+            positions = np.arange(self.rows)
+        else:
+            positions = np.unique(np.linspace(0, self.rows - 1, max_rows).round().astype('int64'))
+
+        nulls = (self.bits[:, positions >> 3] >> (7 - (positions & 7)).astype(np.uint8)) & 1
+
+        return pd.DataFrame(nulls.T.astype(bool), index=positions, columns=self.columns)
+
+
+    def block_rates(self, max_rows = 2000):
+        '''
+        Null rate of every column over at most max_rows blocks of consecutive rows, indexed by each
+        block's first row. Unlike sample() no row is skipped, so short runs of nulls still show.
+        '''
+        if self.rows <= max_rows:
+            return self.sample(max_rows).astype('float64')
+
+        # blocks are whole bytes (8 rows) of the packed bits
+        nbytes = self.bits.shape[1]
+        block = -(-self.rows // (max_rows * 8))
+        blocks = -(-nbytes // block)
+        counts = _popcount(self.bits)
+        counts = np.pad(counts, ((0, 0), (0, blocks * block - nbytes))).reshape(len(self.columns), blocks, block).sum(axis=2, dtype='int64')
+
+        starts = np.arange(blocks) * block * 8
+        sizes = np.minimum(starts + block * 8, self.rows) - starts
+
+        return pd.DataFrame((counts / sizes).T, index=starts, columns=self.columns)
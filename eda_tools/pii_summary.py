@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+from eda_tools.instrumentation import instrument_methods
+
+## One-pass summary tables for a PII report: flag hit rates, state counts, age groups and the SSN
+## validity flag tables. Each chunk of rows is reduced to small count vectors that are added up, so
+## a file of any size is summarized in a single scan of the columns below.
+
+
+FLAG_COLUMNS = {
+    'p_inpclnnamefirstflag': 'First Name',
+    'p_inpclnnamelastflag': 'Last Name',
+    'p_inpclnaddrfullflag': 'Address',
+    'p_inpclnphonehomeflag': 'Phone',
+    'p_inpclnssnflag': 'SSN',
+    'p_inpclndobflag': 'DOB',
+}
+STATE_COLUMN = 'p_inpclnaddrstate'
+AGE_COLUMN = 'pi_inpdobage'
+SSN_FLAG_COLUMNS = ['p_inpvalssnisitinflag', 'p_inpvalssnnonssaflag']
+
+SUMMARY_COLUMNS = list(FLAG_COLUMNS) + [STATE_COLUMN, AGE_COLUMN] + SSN_FLAG_COLUMNS
+
+AGE_BINS = [-100000, 0, 18, 99, 10000]
+AGE_LABELS = ['Unavailable', '<18', '18-99', '100+']
+
+
+def _value_counts(s):
+    '''
+    value_counts in order of first appearance; categoricals (see compact_schema) drop their unused categories
+    '''
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.value_counts(sort=False)
+
+    codes = s.cat.codes.to_numpy()
+    present, first = np.unique(codes[codes >= 0], return_index=True)
+    present = present[np.argsort(first)]
+    counts = np.bincount(codes[codes >= 0], minlength=len(s.cat.categories))[present]
+
+    return pd.Series(counts, index=pd.Index(s.cat.categories[present], name=s.name), name='count')
+
+
+def _add_counts(total, counts):
+    # keep keys in order of first appearance, as value_counts does over the whole column
+    if total is None:
+        return counts
+    index = total.index.union(counts.index, sort=False)
+    return total.reindex(index, fill_value=0) + counts.reindex(index, fill_value=0)
+
+
+@instrument_methods
+class PIISummary():
+    '''
+    Summary counts accumulated chunk by chunk; the accessors return the tables of the matching PII_EDA methods
+    '''
+
+    def __init__(self):
+        self.rows = 0
+        self.raw_count = None
+        self.clean_count = None
+        self.state_count = None
+        self.age_count = None
+        self.ssn_flag_count = {}
+
+
+    @classmethod
+    def from_frame(cls, df, chunksize = None):
+        summary = cls()
+        columns = [c for c in SUMMARY_COLUMNS if c in df.columns]
+        chunksize = chunksize or max(len(df), 1)
+        for start in range(0, len(df), chunksize):
+            summary.update(df[columns].iloc[start:start + chunksize])
+
+        return summary
+
+
+    @classmethod
+    def from_csv(cls, path, chunksize = 500000):
+        summary = cls()
+        for chunk in pd.read_csv(path, usecols=lambda c: c in SUMMARY_COLUMNS, chunksize=chunksize, low_memory=False):
+            summary.update(chunk)
+
+        return summary
+
+
+    def update(self, chunk):
+        '''
+        Add a chunk of rows
+        '''
+        self.rows += len(chunk)
+
+        flags = [c for c in FLAG_COLUMNS if c in chunk.columns]
+        if flags:
+            values = chunk[flags].rename(columns=FLAG_COLUMNS)
+            # stack() in get_hit_rates drops NaN, so raw counts skip it as well
+            raw = (values.notna() & (values != -99999)).sum()
+            clean = (values == 1).sum()
+            self.raw_count = raw if self.raw_count is None else self.raw_count + raw
+            self.clean_count = clean if self.clean_count is None else self.clean_count + clean
+
+        if STATE_COLUMN in chunk.columns:
+            state = chunk[STATE_COLUMN]
+            self.state_count = _add_counts(self.state_count, _value_counts(state[~state.isin([-99999, -99998])]))
+
+        if AGE_COLUMN in chunk.columns:
+            age_group = pd.cut(chunk[AGE_COLUMN], bins=AGE_BINS, labels=AGE_LABELS)
+            counts = age_group.value_counts(sort=False).to_numpy()
+            self.age_count = counts if self.age_count is None else self.age_count + counts
+
+        for column in SSN_FLAG_COLUMNS:
+            if column in chunk.columns:
+                self.ssn_flag_count[column] = _add_counts(self.ssn_flag_count.get(column), _value_counts(chunk[column]))
+
+        return self
+
+
+    def _require(self, counts, column):
+        if counts is None:
+            raise KeyError(column)
+        return counts
+
+
+    def hit_rates(self):
+        '''
+        Raw / clean count and hit rate per PII flag, as PII_EDA.get_hit_rates
+        '''
+        raw = self._require(self.raw_count, list(FLAG_COLUMNS))
+        clean = self.clean_count
+
+        raw_count = raw[raw > 0].sort_index().rename_axis('Input').to_frame('value')
+        clean_count = clean[clean > 0].sort_index().rename_axis('Input').to_frame('value')
+        raw_hit_rate = raw_count / self.rows
+        clean_hit_rate = clean_count / self.rows
+
+        hit_rate = pd.concat([raw_count, raw_hit_rate, clean_count, clean_hit_rate], axis=1)
+        hit_rate.columns = ['Raw Count', 'Raw Hit Rate', 'Clean Count', 'Cleaned Hit Rate']
+
+        return hit_rate
+
+
+    def state_counts(self):
+        '''
+        Records per state, most frequent first
+        '''
+        counts = self._require(self.state_count, STATE_COLUMN).astype('int64')
+
+        return counts.sort_values(ascending=False).rename_axis('State').reset_index(name='Count')
+
+
+    def age_distribution(self):
+        '''
+        Count and percentage per age group, as PII_EDA.get_age_distribution
+        '''
+        counts = self._require(self.age_count, AGE_COLUMN)
+        index = pd.CategoricalIndex(AGE_LABELS, categories=AGE_LABELS, ordered=True)
+        age_count = pd.Series(counts, index=index, name='count').rename_axis('age_group').reset_index(name='Count')
+        age_count['Percentage'] = age_count['Count'] / age_count['Count'].sum() * 100
+
+        return age_count
+
+
+    def flag_table(self, column):
+        '''
+        Records and share of records per value of an SSN flag, as PII_EDA.ssn_is_itin_flag / invalid_ssn_flag
+        '''
+        counts = self._require(self.ssn_flag_count.get(column), column).astype('int64').sort_index()
+        result = counts.rename_axis(column).reset_index(name='# of Records')
+        result['percent_of_records'] = result['# of Records'] / self.rows
+
+        return result
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+## Figures built from pre-aggregated data. The data is reduced on the server (bin counts, value
+## counts) before it reaches Plotly, so the figure JSON sent to the browser holds one point per
+## bin or category however many rows went into it.
+
+
+def histogram_bins(values, nbins = 20):
+    '''
+    Counts and bin edges of values in about nbins equal-width bins; whole-number data gets whole-number edges
+    '''
+    values = np.asarray(values, dtype='float64')
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.zeros(0, dtype='int64'), np.zeros(1)
+
+    low, high = values.min(), values.max()
+    if np.array_equal(values, np.round(values)):
+        # one bin per run of whole numbers, so no bin straddles a value
+        width = max(1, int(np.ceil((high - low + 1) / nbins)))
+        edges = low - 0.5 + width * np.arange(int(np.ceil((high - low + 1) / width)) + 1)
+    else:
+        edges = np.histogram_bin_edges(values, bins=nbins)
+
+    counts, edges = np.histogram(values, bins=edges)
+
+    return counts, edges
+
+
+def histogram(values, nbins = 20, x_title = None, y_title = 'Count'):
+    '''
+    Histogram figure of values drawn as bars over server-side bin counts
+    '''
+    counts, edges = histogram_bins(values, nbins)
+    bins = pd.DataFrame({'x': (edges[:-1] + edges[1:]) / 2, 'Count': counts, 'From': edges[:-1], 'To': edges[1:]})
+
+    fig = px.bar(bins, x='x', y='Count', hover_data=['From', 'To'])
+    fig.update_traces(width=np.diff(edges))
+    fig.update_layout(bargap=0, xaxis_title=x_title, yaxis_title=y_title)
+
+    return fig
+
+
+def state_choropleth(state_count, locations = 'State', color = 'Count'):
+    '''
+    US state map of per-state counts (one row per state, e.g. PII_EDA.top_states)
+    '''
+    return px.choropleth(state_count, locations=locations, locationmode='USA-states', color=color, scope='usa')
@@ -0,0 +1,131 @@
+import numpy as np
+from ydata_profiling import ProfileReport
+
+from eda_tools.instrumentation import instrument_methods
+
+## Size-adaptive profiling. The cost of a ydata-profiling report grows with rows x columns and with the
+## sections switched on, so the input size picks a tier:
+##   full     - the default config on every row and column
+##   reduced  - every row and column, with the costly sections off (yprofile_config_reduced.yaml)
+##   sampled  - the reduced config on a stratified row sample and a column subset
+## The tier is written into the report description and the ReportCache key.
+
+
+FULL_CONFIG = 'profile_config/yprofile_config_default.yaml'
+REDUCED_CONFIG = 'profile_config/yprofile_config_reduced.yaml'
+
+# cells (rows x columns) up to which each tier stays within tens of seconds
+FULL_MAX_CELLS = 2000000
+REDUCED_MAX_CELLS = 20000000
+
+SAMPLE_ROWS = 100000
+SAMPLE_COLUMNS = 200
+
+TIERS = ['full', 'reduced', 'sampled']
+
+
+def choose_tier(rows, columns):
+    '''
+    Profiling tier for a frame of the given size
+    '''
+    cells = rows * columns
+    if cells <= FULL_MAX_CELLS:
+        return 'full'
+    if cells <= REDUCED_MAX_CELLS:
+        return 'reduced'
+
+    return 'sampled'
+
+
+def stratified_sample(df, n, strata=None, random_state=0):
+    '''
+    About n rows, sampled proportionally within each value of `strata` (simple random sample if None),
+    in their original order
+    '''
+    if len(df) <= n:
+        return df
+
+    rng = np.random.default_rng(random_state)
+    if strata is None:
+        positions = rng.choice(len(df), n, replace=False)
+    else:
+        frac = n / len(df)
+        # every stratum keeps at least one row, so rare values still show up in the report
+        positions = np.concatenate([
+            rng.choice(group, max(1, round(len(group) * frac)), replace=False)
+            for group in df.groupby(strata, dropna=False).indices.values()
+        ])
+
+    return df.iloc[np.sort(positions)]
+
+
+def column_subset(df, max_columns, keep=None):
+    '''
+    At most max_columns columns, preferring the most populated ones; `keep` columns are always included.
+    Columns stay in their original order
+    '''
+    if df.shape[1] <= max_columns:
+        return df
+
+    keep = [c for c in (keep or []) if c in df.columns]
+    ranked = df.notna().sum().drop(keep).sort_values(ascending=False, kind='stable')
+    chosen = set(keep) | set(ranked.index[:max(max_columns - len(keep), 0)])
+
+    return df[[c for c in df.columns if c in chosen]]
+
+
+@instrument_methods
+class ProfilePlan():
+    '''
+    The tier, config and data a report is built from
+    '''
+
+    def __init__(self, df, tier=None, strata=None, sample_rows=SAMPLE_ROWS, sample_columns=SAMPLE_COLUMNS, random_state=0):
+        self.tier = tier or choose_tier(*df.shape)
+        if self.tier not in TIERS:
+            raise ValueError(f"Unknown profiling tier '{self.tier}', expected one of {TIERS}")
+
+        self.source_shape = df.shape
+        self.strata = strata
+        self.config_file = FULL_CONFIG if self.tier == 'full' else REDUCED_CONFIG
+        self.options = {'tier': self.tier}
+
+        if self.tier == 'sampled':
+            keep = [strata] if strata is not None else []
+            self.data = column_subset(stratified_sample(df, sample_rows, strata, random_state), sample_columns, keep)
+            self.options.update(sample_rows=sample_rows, sample_columns=sample_columns, strata=strata, random_state=random_state)
+        else:
+            self.data = df
+
+
+    def description(self):
+        '''
+        Sentence stating which tier the report was built with
+        '''
+        rows, columns = self.source_shape
+        if self.tier == 'full':
+            return 'Full profile of all rows and columns.'
+        if self.tier == 'reduced':
+            return f'Reduced profile of all {rows:,} rows and {columns:,} columns; timeseries, chi-squared, text length and duplicate sections are off.'
+
+        strata = f', stratified by {self.strata}' if self.strata is not None else ''
+        return (f'Sampled profile of {len(self.data):,} of {rows:,} rows{strata} and {self.data.shape[1]:,} of {columns:,} columns, '
+                f'with the reduced sections. Statistics are estimates from the sample.')
+
+
+    def cache_key(self, cache, df, fingerprint=None):
+        '''
+        ReportCache key of this plan's report
+        '''
+        return cache.key(df, self.config_file, fingerprint, explorative=False, **self.options)
+
+
+    def build(self):
+        '''
+        Build the report, returning its html and json
+        '''
+        profile = ProfileReport(self.data, explorative=False, config_file=self.config_file)
+        parts = [profile.config.dataset.description, self.description()]
+        profile.config.dataset.description = ' - '.join(part for part in parts if part)
+
+        return {'html': profile.to_html(), 'json': profile.to_json()}
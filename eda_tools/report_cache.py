@@ -0,0 +1,222 @@
+import hashlib
+import os
+import threading
+import time
+
+import pandas as pd
+
+
+def fingerprint_frame(df):
+    '''
+    Content hash of a dataframe (values, index, column names and dtypes)
+    '''
+    h = hashlib.sha256()
+    h.update(repr(list(df.columns)).encode())
+    h.update(repr([str(t) for t in df.dtypes]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+
+    return h.hexdigest()
+
+
+def fingerprint_file(path):
+    '''
+    Content hash of a file, e.g. a profiling YAML config
+    '''
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+class ReportCache():
+    '''
+    Content-addressed on-disk cache for rendered reports (HTML / JSON).
+
+    Entries are keyed by a fingerprint of the input data plus the config hash, kept
+    under a total size budget and evicted least-recently-used first. Builds of the
+    same key are serialized so concurrent sessions share one computation.
+    '''
+
+    def __init__(self, cache_dir='.report_cache', max_bytes=512 * 1024 * 1024, lock_timeout=3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock_timeout = lock_timeout
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+
+    def key(self, df, config_file=None, fingerprint=None, **extra):
+        '''
+        Build the cache key for a dataframe, a config file and any extra report options.
+        A fingerprint_frame(df) computed earlier can be passed to skip hashing the frame again.
+        '''
+        h = hashlib.sha256()
+        h.update((fingerprint or fingerprint_frame(df)).encode())
+        if config_file is not None:
+            h.update(fingerprint_file(config_file).encode())
+        for name in sorted(extra):
+            h.update(f'{name}={extra[name]!r}'.encode())
+
+        return h.hexdigest()
+
+
+    def path(self, key, kind='html'):
+        return os.path.join(self.cache_dir, f'{key}.{kind}')
+
+
+    def get(self, key, kind='html'):
+        '''
+        Return the cached content, or None on a miss. A hit refreshes the entry's LRU position
+        '''
+        path = self.path(key, kind)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return content
+
+
+    def put(self, key, content, kind='html'):
+        '''
+        Atomically store content under key, then enforce the size budget
+        '''
+        path = self.path(key, kind)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp, path)
+        self.evict()
+
+
+    def get_or_create(self, key, build, kind='html'):
+        '''
+        Return the cached content for key, building it at most once.
+
+        `build` is called without arguments and must return a dict mapping kind -> content
+        (e.g. {'html': ..., 'json': ...}); every returned kind is stored.
+        '''
+        content = self.get(key, kind)
+        if content is not None:
+            return content
+
+        with self._thread_lock(key), self._file_lock(key):
+            # another session may have finished the build while we waited
+            content = self.get(key, kind)
+            if content is not None:
+                return content
+
+            built = build()
+            for k, v in built.items():
+                self.put(key, v, k)
+
+        return built[kind]
+
+
+    def entries(self):
+        '''
+        List cached files as (path, size, last access) tuples
+        '''
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.tmp') or name.endswith('.lock'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+
+        return entries
+
+
+    def evict(self):
+        '''
+        Remove least recently used entries until the cache fits in max_bytes
+        '''
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(e[1] for e in entries)
+
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._prune_lock(path)
+            total -= size
+
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._prune_lock(path)
+
+
+    def _thread_lock(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+
+    def _prune_lock(self, path):
+        # drop the thread lock of an evicted entry unless a build holds it; a waiter that still has the
+        # old lock object is serialized with any new one by the file lock
+        key = os.path.splitext(os.path.basename(path))[0]
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is not None and not lock.locked():
+                del self._locks[key]
+
+
+    def _file_lock(self, key):
+        return _FileLock(os.path.join(self.cache_dir, f'{key}.lock'), self.lock_timeout)
+
+
+class _FileLock():
+    '''
+    Cross-process lock based on exclusive creation of a lock file
+    '''
+
+    def __init__(self, path, timeout, poll=0.5):
+        self.path = path
+        self.timeout = timeout
+        self.poll = poll
+
+
+    def __enter__(self):
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                # a crashed builder leaves its lock behind; treat old locks as stale
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.timeout:
+                        os.remove(self.path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                time.sleep(self.poll)
+
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
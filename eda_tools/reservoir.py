@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+from eda_tools.instrumentation import instrument_methods
+
+## Seeded bottom-k sampling. Every row gets a pseudo-random 64-bit key computed from its position in
+## the file and the seed; a sample of n rows is the n matching rows with the smallest keys. A key
+## doesn't depend on how the file is chunked or on which other rows match, so a single streaming pass
+## over a CSV picks exactly the rows that sampling the same data in memory does, and reruns with the
+## same seed show the same rows. Distinct values are sampled the same way with keys hashed from the value.
+
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(x):
+    '''
+    splitmix64 finalizer: a uint64 -> uint64 bijection that spreads nearby inputs over the whole range
+    '''
+    with np.errstate(over='ignore'):
+        x = x ^ (x >> np.uint64(30))
+        x = x * np.uint64(0xBF58476D1CE4E5B9)
+        x = x ^ (x >> np.uint64(27))
+        x = x * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def _seed_key(seed):
+    with np.errstate(over='ignore'):
+        return _mix(np.uint64(seed) * _GOLDEN + _GOLDEN)
+
+
+def row_keys(positions, seed = 0):
+    '''
+    Sampling key of each row position
+    '''
+    return _mix(np.asarray(positions, dtype=np.uint64) ^ _seed_key(seed))
+
+
+def value_keys(values, seed = 0):
+    '''
+    Sampling key of each value; numbers key by value (5 and 5.0 match), anything else by its text
+    '''
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        values = values.astype('float64')
+    else:
+        values = values.astype(str)
+
+    return _mix(pd.util.hash_pandas_object(values, index=False).to_numpy() ^ _seed_key(seed))
+
+
+def bottom_k(keys, n):
+    '''
+    Positions of the n smallest keys, smallest first
+    '''
+    keys = np.asarray(keys)
+    if len(keys) > n:
+        keep = np.argpartition(keys, n)[:n]
+    else:
+        keep = np.arange(len(keys))
+
+    return keep[np.argsort(keys[keep], kind='stable')]
+
+
+def _as_mask(mask):
+    # comparisons on nullable columns give <NA> for missing values, which never match
+    if isinstance(mask, pd.Series):
+        return mask.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(mask, dtype=bool)
+
+
+def column_positions(df, columns):
+    '''
+    Positions of `columns` in df for iloc; a missing column raises KeyError instead of selecting position -1
+    '''
+    positions = df.columns.get_indexer_for(columns)
+    if (positions < 0).any():
+        raise KeyError([c for c, p in zip(columns, positions) if p < 0])
+
+    return positions
+
+
+def sample_positions(mask, n = 10, seed = 0, offset = 0):
+    '''
+    Up to n positions where mask holds, chosen by row key; offset is the position of mask[0] in the file
+    '''
+    positions = np.flatnonzero(_as_mask(mask))
+
+    return positions[bottom_k(row_keys(positions + offset, seed), n)]
+
+
+@instrument_methods
+class ReservoirSampler():
+    '''
+    Samples of the rows matching each of several predicates, collected in one pass over chunks of a file.
+
+    predicates: {name: (predicate, columns)} where predicate(chunk) gives a boolean mask of the
+    chunk's rows and columns are the columns kept for the sample
+    '''
+
+    def __init__(self, predicates, n = 10, seed = 0):
+        self.predicates = predicates
+        self.n = n
+        self.seed = seed
+        self.rows = 0
+        self.matches = {name: 0 for name in predicates}
+        self._keys = {name: np.zeros(0, dtype=np.uint64) for name in predicates}
+        self._samples = {name: None for name in predicates}
+
+
+    @classmethod
+    def from_chunks(cls, chunks, predicates, n = 10, seed = 0):
+        sampler = cls(predicates, n, seed)
+        for chunk in chunks:
+            sampler.update(chunk)
+
+        return sampler
+
+
+    @classmethod
+    def from_frame(cls, df, predicates, n = 10, seed = 0, chunksize = None):
+        chunksize = chunksize or max(len(df), 1)
+        return cls.from_chunks((df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize)), predicates, n, seed)
+
+
+    @classmethod
+    def from_csv(cls, path, predicates, n = 10, seed = 0, chunksize = 500000, **csv_kwargs):
+        return cls.from_chunks(pd.read_csv(path, chunksize=chunksize, **{'low_memory': False, **csv_kwargs}), predicates, n, seed)
+
+
+    def update(self, chunk):
+        '''
+        Add the next chunk of rows
+        '''
+        for name, (predicate, columns) in self.predicates.items():
+            positions = np.flatnonzero(_as_mask(predicate(chunk)))
+            self.matches[name] += len(positions)
+            if len(positions) == 0:
+                continue
+
+            keys = row_keys(positions + self.rows, self.seed)
+            best = bottom_k(keys, self.n)
+            # the chunk's best candidates against the sample so far; only the rows kept are materialized
+            keys = np.concatenate([self._keys[name], keys[best]])
+            rows = chunk.iloc[positions[best], column_positions(chunk, columns)]
+            if self._samples[name] is not None:
+                rows = pd.concat([self._samples[name], rows])
+            keep = bottom_k(keys, self.n)
+
+            self._keys[name] = keys[keep]
+            self._samples[name] = rows.iloc[keep]
+
+        self.rows += len(chunk)
+
+        return self
+
+
+    def sample(self, name):
+        '''
+        Sampled rows for predicate `name` in key order (empty if no row matched)
+        '''
+        if self._samples[name] is None:
+            return pd.DataFrame(columns=self.predicates[name][1])
+
+        return self._samples[name]
+
+
+    def samples(self):
+        return {name: self.sample(name) for name in self.predicates}
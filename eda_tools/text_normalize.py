@@ -0,0 +1,87 @@
+import pandas as pd
+
+## Column-wise text normalization for PII fields. Every function takes and returns a whole Series;
+## work is done once per distinct value, so repeated names/addresses/states cost nothing extra.
+
+
+# mixed-type CSV columns carry the sentinel as text, so match both forms
+SENTINELS = [-99999, '-99999']
+
+
+def _on_uniques(s, fn):
+    '''
+    Apply a Series -> Series transform to the distinct values of s and broadcast back
+    '''
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    result = fn(pd.Series(uniques, dtype=s.dtype))
+
+    out = result.take(codes.clip(min=0)).to_numpy(dtype=object)
+    out[codes == -1] = ''
+
+    return pd.Series(out, index=s.index, name=s.name)
+
+
+def _as_text(s):
+    '''
+    Render values as text; whole floats (e.g. phone numbers parsed as float64) lose the trailing '.0'
+    '''
+    if pd.api.types.is_float_dtype(s.dtype):
+        whole = s == s.round()
+        if whole.all():
+            return s.astype('int64').astype(str)
+
+    return s.astype(str)
+
+
+def normalize_text(s, sentinels=SENTINELS, case=None, strip=False):
+    '''
+    Vectorized equivalent of PII_EDA.clean_df over a whole column: sentinel values and NaN become '',
+    runs of whitespace collapse to one space. Optionally fold case ('upper' / 'lower') and strip ends.
+    '''
+    def transform(u):
+        text = u.astype(str).str.replace(r'\s+', ' ', regex=True)
+        if strip:
+            text = text.str.strip()
+        if case == 'upper':
+            text = text.str.upper()
+        elif case == 'lower':
+            text = text.str.lower()
+        return text.mask(u.isin(sentinels), '')
+
+    return _on_uniques(s, transform)
+
+
+def extract_digits(s, sentinels=SENTINELS):
+    '''
+    Keep only the digits of each value (phone numbers, SSNs); sentinel values and NaN become ''
+    '''
+    def transform(u):
+        text = _as_text(u) if pd.api.types.is_numeric_dtype(u.dtype) else u.astype(str).str.replace(r'\.0+$', '', regex=True)
+        digits = text.str.replace(r'\D', '', regex=True)
+        return digits.mask(u.isin(sentinels), '')
+
+    return _on_uniques(s, transform)
+
+
+def normalize_frame(df, sentinels=SENTINELS, case=None, strip=False):
+    '''
+    Apply normalize_text to every column of df
+    '''
+    return pd.DataFrame({c: normalize_text(df[c], sentinels, case, strip) for c in df.columns}, index=df.index)
+
+
+def duplicate_keys(pii, normalize=True):
+    '''
+    Comparison keys for duplicate detection from a PII_EDA.get_PII_data() frame: (address, phone, SSN, name).
+    Normalized keys are case/whitespace-folded text for address and names and digits for phone and SSN.
+    '''
+    if not normalize:
+        # categorical names (compact_schema) concatenate as plain values
+        return pii['Address'], pii['Phone'], pii['SSN'], pii['First Name'].astype(object) + pii['Last Name'].astype(object)
+
+    address = normalize_text(pii['Address'], case='upper', strip=True)
+    phone = extract_digits(pii['Phone'])
+    ssn = extract_digits(pii['SSN'])
+    name = normalize_text(pii['First Name'], case='upper', strip=True) + ' ' + normalize_text(pii['Last Name'], case='upper', strip=True)
+
+    return address, phone, ssn, name
@@ -1,17 +1,142 @@
 #| label: input data
+import contextlib
+import os
+import time
+
 import pandas as pd
 import numpy as np  
 from ydata_profiling import ProfileReport
 import streamlit as st
-from streamlit_pandas_profiling import st_profile_report
 import streamlit.components.v1 as components
+
 import eda_tools.missing_analysis as ma
 import eda_tools.EDA_tool as eda
+from eda_tools.report_cache import ReportCache, fingerprint_frame
+from eda_tools.data_viewer import FrameView, render_data_viewer
+from eda_tools.profile_tiers import ProfilePlan
+from eda_tools.job_runner import JobRunner, file_job_key, profile_report_job, pii_report_job
+from eda_tools.instrumentation import recording
+
+DATA_FILE = 'test.csv'
+
+
+@st.cache_resource
+def load_data(path):
+    # one frame per server process, shared read-only by the reports and the data viewer; st.cache_data
+    # would hand each caller its own copy, on top of the one the viewer keeps
+    return pd.read_csv(path, index_col = 0)
+
+
+@st.cache_resource(max_entries=8)
+def get_fingerprint(path, file_key):
+    # file_key changes with the file's size and mtime, so the frame is hashed once per file version, not per rerun
+    return fingerprint_frame(load_data(path))
+
+
+@st.cache_resource(max_entries=4)
+def get_profile_plan(path, fingerprint, tier=None):
+    # the sampled tier samples the whole frame, so a plan is built once per data version, not per poll rerun
+    return ProfilePlan(load_data(path), tier=tier)
+
+
+@st.cache_resource
+def get_frame_view(path):
+    # sort indexes and filter masks are kept across reruns and sessions
+    return FrameView(load_data(path))
+
+
+@st.cache_resource
+def get_report_cache():
+    # one cache object per server process, shared by every session
+    return ReportCache(cache_dir='.report_cache', max_bytes=512 * 1024 * 1024)
+
+
+@st.cache_resource
+def get_job_runner():
+    # shared by every session, so a report requested twice is computed once
+    return JobRunner(max_workers=2, artifact_dir='.report_jobs', max_bytes=512 * 1024 * 1024)
+
+
+def job_result(runner, key, fn, *args):
+    '''
+    Submit (or attach to) a job and return its result; while it runs, show its progress and return None.
+    A failed job shows its error and is only run again from its Retry button.
+    '''
+    status = runner.status(key)
+    if status['state'] == 'missing':
+        runner.submit(key, fn, *args)
+        status = runner.status(key)
+    if status['state'] == 'done':
+        return runner.result(key)
+    if status['state'] == 'failed':
+        st.error(status['message'])
+        if st.button('Retry', key=f'retry_{key}'):
+            runner.retry(key)
+            st.experimental_rerun()
+        return None
+
+    st.progress(status['progress'], text=f"{status['state']}: {status['message']}")
+    return None
+
+
+def render_metrics_panel(recorder):
+    '''
+    Sidebar breakdown of the instrumented calls of this run, with JSON and Chrome-trace downloads
+    '''
+    with st.sidebar.expander('Timings', expanded=True):
+        st.dataframe(recorder.report().round(4))
+        st.download_button('Download JSON', recorder.to_json(), file_name='eda_timings.json', mime='application/json')
+        st.download_button('Download Chrome trace', recorder.to_chrome_trace(), file_name='eda_trace.json', mime='application/json')
+
+
+record_timings = st.sidebar.checkbox('Record timings')
+track_memory = st.sidebar.checkbox('Track peak memory (slower)', disabled=not record_timings)
+
+with recording(trace_memory=track_memory) if record_timings else contextlib.nullcontext() as recorder:
+    df = load_data(DATA_FILE)
+    render_data_viewer(get_frame_view(DATA_FILE))
+
+    # Profile Report: the tier (full / reduced / sampled) follows the size of the data; reports are built
+    # by the job runner, so a rerun or browser refresh attaches to the job already running
+    cache = get_report_cache()
+    runner = get_job_runner()
+    fingerprint = get_fingerprint(DATA_FILE, file_job_key('data', DATA_FILE))
+    plan = get_profile_plan(DATA_FILE, fingerprint)
+    full_key = get_profile_plan(DATA_FILE, fingerprint, 'full').cache_key(cache, df, fingerprint)
+    report_key = plan.cache_key(cache, df, fingerprint)
+    # a full report built earlier in the background replaces the faster tier
+    full_html = cache.get(full_key)
+    report_html = full_html or cache.get(report_key)
+
+    if report_html is None:
+        report_html = job_result(runner, report_key, profile_report_job, DATA_FILE, plan.tier)
+
+    if plan.tier != 'full' and full_html is None:
+        st.info(plan.description())
+        if runner.status(full_key)['state'] in ['queued', 'running']:
+            job_result(runner, full_key, profile_report_job, DATA_FILE, 'full')
+        elif st.button('Build the full report in the background'):
+            runner.submit(full_key, profile_report_job, DATA_FILE, 'full')
+            st.experimental_rerun()
+
+    if report_html is not None:
+        components.html(report_html, height=1000, scrolling=True)
+    #components.html(profile.to_notebook_iframe())
+
+    # PII report tables for a PII vendor file, computed by the job runner
+    pii_file = st.sidebar.text_input('PII file')
+    if pii_file and not os.path.isfile(pii_file):
+        st.sidebar.error(f'No such file: {pii_file}')
+    elif pii_file:
+        pii_tables = job_result(runner, file_job_key('pii', pii_file), pii_report_job, pii_file)
+        for title, table in (pii_tables or {}).items():
+            st.subheader(title)
+            st.dataframe(table)
 
-df = pd.read_csv('test.csv', index_col = 0)
-st.dataframe(df)
+if recorder is not None:
+    render_metrics_panel(recorder)
 
-# Profile Report
-profile = ProfileReport(df, explorative=False, config_file="profile_config/yprofile_config_default.yaml")
-st_profile_report(profile)
-#components.html(profile.to_notebook_iframe())
+# poll running jobs for progress
+if runner.active():
+    time.sleep(1)
+    st.experimental_rerun()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# run from anywhere: import eda_tools from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('ydata_profiling')
+from eda_tools.EDA_tool import Correlation
+
+## The sampled search for highly correlated pairs against the exact table: columns given as a list
+## must work, and heavy-tailed columns (test.csv) must not lose pairs to the sample.
+
+
+TEST_CSV = os.path.join(os.path.dirname(__file__), '..', 'test.csv')
+
+
+def _pairs(pairs):
+    return set(zip(pairs['Variable 1'], pairs['Variable 2']))
+
+
+def _exact(df, threshold):
+    corr = Correlation(df, 'Pearson', threshold)
+    corr.correlation_table()
+    return corr.get_highly_correlated_pairs()
+
+
+@pytest.mark.parametrize('threshold', [0.6, 0.9])
+def test_approximate_pairs_match_exact_with_list_columns(threshold):
+    df = pd.read_csv(TEST_CSV, index_col=0).select_dtypes('number')
+    df = df.mask(df.isin([-99999, -99998]))
+
+    approximate = Correlation(df, 'Pearson', threshold, columns=list(df.columns))
+    pairs = approximate.approximate_highly_correlated_pairs(sample_size=200)
+
+    assert _pairs(pairs) == _pairs(_exact(df, threshold))
+
+
+def test_approximate_pairs_prune_gaussian_columns():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(100000, 20))
+    x[:, 1] = x[:, 0] + 0.3 * x[:, 1]
+    df = pd.DataFrame(x, columns=[f'c{i}' for i in range(20)])
+
+    approximate = Correlation(df, 'Pearson', 0.6, columns=list(df.columns))
+    pairs = approximate.approximate_highly_correlated_pairs()
+
+    assert _pairs(pairs) == _pairs(_exact(df, 0.6)) == {('c0', 'c1')}
+    # only the candidate pair was computed on every row
+    assert len(approximate.pair_intervals) < 10
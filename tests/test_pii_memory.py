@@ -0,0 +1,116 @@
+import gc
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from eda_tools.PII_EDA_tool import PII_EDA
+
+## Memory-peak regression test for the PII_EDA report: every method selects its columns and rows
+## before materializing anything, so running the whole report back to back must stay within a small
+## multiple of the input frame instead of copying it per call.
+
+
+ROWS = 50000
+
+# peak traced allocations of the whole report, as a multiple of the input frame's size
+MAX_PEAK_RATIO = 1.5
+
+REPORT = [
+    'get_hit_rates', 'validate_address', 'validate_name', 'validate_DOB', 'validate_phone', 'validate_ssn',
+    'state_distribution', 'top_states', 'get_age_distribution', 'ssn_is_itin_flag', 'ssn_is_itin_sample',
+    'invalid_ssn_flag', 'invalid_ssn_sample', 'duplicate_PII', 'duplicate_address', 'duplicate_address_name',
+    'duplicate_phone', 'duplicate_phone_name', 'duplicate_SSN', 'duplicate_SSN_name',
+]
+
+FLAG_COLUMNS = ['p_inpclnnamefirstflag', 'p_inpclnnamelastflag', 'p_inpclnaddrfullflag',
+                'p_inpclnphonehomeflag', 'p_inpclnssnflag', 'p_inpclndobflag']
+
+
+def pii_csv(path, n, seed=0):
+    '''
+    n seeded PII records in the layout PII_EDA reads, with sentinels, flags and repeated identifiers, written to path
+    '''
+    rng = np.random.default_rng(seed)
+
+    def sentinels(values, rate=0.03, sentinel=-99999):
+        values = np.asarray(values).astype(object)
+        values[rng.random(n) < rate] = sentinel
+        return values
+
+    first = rng.choice(['JOHN', 'MARY', 'ROBERT', 'LINDA', 'DAVID', 'SUSAN'], n).astype(object)
+    last = rng.choice([f'NAME{i}' for i in range(max(n // 50, 10))], n).astype(object)
+    state = rng.choice(['CA', 'TX', 'FL', 'NY', 'PA', 'IL'], n).astype(object)
+    city = rng.choice(['SPRINGFIELD', 'FRANKLIN', 'SALEM'], n).astype(object)
+    # a small pool of values per identifier, so every duplicate report has matches
+    address = pd.Series(rng.integers(1, n // 5, n)).astype(str).to_numpy(dtype=object) + ' MAIN ST'
+    phone = rng.integers(2000000000, 2000000000 + n // 5, n)
+    ssn = rng.integers(100000000, 100000000 + n // 5, n)
+    age = rng.integers(1, 105, n)
+    dob = (2023 - age) * 10000 + rng.integers(1, 13, n) * 100 + rng.integers(1, 29, n)
+
+    df = pd.DataFrame({
+        'p_inpacct': np.arange(n),
+        'p_inpnamefirst': sentinels(first, sentinel='-99999'),
+        'p_inpnamelast': sentinels(last, sentinel='-99999'),
+        'p_inpdob': sentinels(dob),
+        'pi_inpdobage': sentinels(age),
+        'p_inpaddrline1': sentinels(address),
+        'p_inpaddrline2': sentinels(np.full(n, 'APT 1'), rate=0.8),
+        'p_inpaddrcity': sentinels(city),
+        'p_inpaddrstate': sentinels(state),
+        'p_inpaddrzip': sentinels(rng.integers(10000, 99999, n)),
+        'p_inpphonehome': sentinels(phone),
+        'p_inpssn': sentinels(ssn),
+        'p_inpclnnamefirst': first,
+        'p_inpclnnamelast': last,
+        'p_inpclnaddrfull': sentinels(address + ' ' + city + ' ' + state),
+        'p_inpclnaddrstate': sentinels(state),
+        'p_inpclnphonehome': sentinels(phone, sentinel=-99998),
+        'p_inpclnssn': sentinels(ssn, sentinel=-99998),
+    })
+    for column in FLAG_COLUMNS:
+        df[column] = rng.choice([1, 1, 1, 0, -99999], n)
+    df['p_inpvalssnisitinflag'] = (rng.random(n) < 0.02).astype('int64')
+    df['p_inpvalssnnonssaflag'] = (rng.random(n) < 0.05).astype('int64')
+    df.to_csv(path, index=False)
+
+    return str(path)
+
+
+@pytest.fixture
+def pii(tmp_path):
+    return PII_EDA(pii_csv(tmp_path / 'pii.csv', ROWS))
+
+
+def test_full_report_peak_memory(pii, monkeypatch):
+    monkeypatch.setattr(go.Figure, 'show', lambda self, *args, **kwargs: None)
+    input_bytes = pii.df.memory_usage(deep=True).sum()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for method in REPORT:
+            getattr(pii, method)()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert peak < MAX_PEAK_RATIO * input_bytes, f'report peaked at {peak / input_bytes:.2f}x the input size'
+
+
+def test_samples_require_existing_columns(pii):
+    pii.df = pii.df.drop(columns=['p_inpaddrzip'])
+
+    with pytest.raises(KeyError):
+        pii.validate_address()
+
+
+def test_samples_only_instance_rejects_other_reports(tmp_path):
+    samples = PII_EDA.from_samples(pii_csv(tmp_path / 'pii.csv', 2000), use_cache=False)
+
+    assert len(samples.validate_ssn()) > 0
+    with pytest.raises(AttributeError, match='from_samples'):
+        samples.get_hit_rates()